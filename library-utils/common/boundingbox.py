@@ -2,10 +2,18 @@
 Library for dealing with bounding boxes (2D areas defined by four points).
 """
 
-from typing import Dict, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# numpy is optional, it is only needed for the batch operations on arrays
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 
 class BoundingBox:
+    __slots__ = ("xmin", "ymin", "xmax", "ymax")
+
     def __init__(
         self,
         xmin: Optional[float] = None,
@@ -52,18 +60,68 @@ class BoundingBox:
     def addPoint(
         self, x: Optional[float], y: Optional[float], radius: float = 0.0
     ) -> None:
+        # fast path for the common case of a valid box and a complete point
+        # xmin/xmax (and ymin/ymax) are always set together
+        if x is not None and y is not None and self.xmin is not None:
+            if self.ymin is not None:
+                if x - radius < self.xmin:
+                    self.xmin = x - radius
+                if x + radius > self.xmax:
+                    self.xmax = x + radius
+                if y - radius < self.ymin:
+                    self.ymin = y - radius
+                if y + radius > self.ymax:
+                    self.ymax = y + radius
+                return
+
         # x might be 'None' so prevent subtraction
-        self.xmin = self.checkMin(self.xmin, x - radius if x else x)
-        self.xmax = self.checkMax(self.xmax, x + radius if x else x)
+        self.xmin = self.checkMin(self.xmin, x - radius if x is not None else x)
+        self.xmax = self.checkMax(self.xmax, x + radius if x is not None else x)
 
         # y might be 'None' so prevent subtraction
-        self.ymin = self.checkMin(self.ymin, y - radius if y else y)
-        self.ymax = self.checkMax(self.ymax, y + radius if y else y)
+        self.ymin = self.checkMin(self.ymin, y - radius if y is not None else y)
+        self.ymax = self.checkMax(self.ymax, y + radius if y is not None else y)
+
+    # Add many points at once, either an Nx2 array or an iterable of (x, y)
+    def addPoints(self, points: Any, radius: float = 0.0) -> None:
+        if numpy is not None and isinstance(points, numpy.ndarray):
+            if points.size == 0:
+                return
+            lo = points.min(axis=0)
+            hi = points.max(axis=0)
+            self.addPoint(float(lo[0]) - radius, float(lo[1]) - radius)
+            self.addPoint(float(hi[0]) + radius, float(hi[1]) + radius)
+            return
+
+        points = list(points)
+        if not points:
+            return
+        xs, ys = zip(*points)
+        self.addPoint(min(xs) - radius, min(ys) - radius)
+        self.addPoint(max(xs) + radius, max(ys) + radius)
 
     def addBoundingBox(self, other: "BoundingBox") -> None:
         self.addPoint(other.xmin, other.ymin)
         self.addPoint(other.xmax, other.ymax)
 
+    # Return a new box containing both boxes
+    def union(self, other: "BoundingBox") -> "BoundingBox":
+        bb = BoundingBox(self.xmin, self.ymin, self.xmax, self.ymax)
+        bb.addBoundingBox(other)
+        return bb
+
+    # Return a new box of the common area, it is not valid if the boxes don't overlap
+    def intersection(self, other: "BoundingBox") -> "BoundingBox":
+        if not self.overlaps(other):
+            return BoundingBox()
+
+        return BoundingBox(
+            max(self.xmin, other.xmin),
+            max(self.ymin, other.ymin),
+            min(self.xmax, other.xmax),
+            min(self.ymax, other.ymax),
+        )
+
     @property
     def valid(self) -> bool:
         return (
@@ -95,16 +153,48 @@ class BoundingBox:
         self.xmax += distance
         self.ymax += distance
 
+    # Boxes that only touch each other also overlap
     def overlaps(self, other: "BoundingBox") -> bool:
-        return any(
-            [
-                self.containsPoint(other.xmin, other.ymin),
-                self.containsPoint(other.xmin, other.ymax),
-                self.containsPoint(other.xmax, other.ymax),
-                self.containsPoint(other.xmax, other.ymin),
-            ]
+        if not self.valid or not other.valid:
+            return False
+
+        return (
+            other.xmin <= self.xmax
+            and self.xmin <= other.xmax
+            and other.ymin <= self.ymax
+            and self.ymin <= other.ymax
         )
 
+    # Test this box against many boxes given as Nx4 array of (xmin, ymin, xmax, ymax)
+    # Returns a boolean array (or list without numpy), same semantic as overlaps()
+    def overlapsMany(self, boxes: Any) -> Any:
+        if numpy is not None:
+            a = numpy.asarray(boxes, dtype=float).reshape(-1, 4)
+            if not self.valid:
+                return numpy.zeros(len(a), dtype=bool)
+            return (
+                (a[:, 0] <= self.xmax)
+                & (self.xmin <= a[:, 2])
+                & (a[:, 1] <= self.ymax)
+                & (self.ymin <= a[:, 3])
+            )
+
+        if not self.valid:
+            return [False] * len(boxes)
+        return [
+            xmin <= self.xmax
+            and self.xmin <= xmax
+            and ymin <= self.ymax
+            and self.ymin <= ymax
+            for xmin, ymin, xmax, ymax in boxes
+        ]
+
+    # The box as (xmin, ymin, xmax, ymax), e.g. as a row for overlapsMany()
+    def asTuple(
+        self,
+    ) -> Tuple[Optional[float], Optional[float], Optional[float], Optional[float]]:
+        return (self.xmin, self.ymin, self.xmax, self.ymax)
+
     @property
     def x(self) -> Optional[float]:
         return self.xmin
@@ -139,6 +229,127 @@ class BoundingBox:
             return {"x": 0.0, "y": 0.0}
 
 
+# Overlap test of two (xmin, ymin, xmax, ymax) tuples, see BoundingBox.overlaps()
+def _boxesOverlap(a, b) -> bool:
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def _area(a) -> float:
+    return (a[2] - a[0]) * (a[3] - a[1])
+
+
+class BoundingBoxTree:
+    """
+    Bounding volume hierarchy for overlap queries between many boxes
+    (e.g. the courtyards of all footprints placed on a panel).
+    Results are indices into the list of boxes the tree was built from,
+    invalid boxes never overlap anything.
+    """
+
+    # maximum number of boxes in a leaf of the tree
+    LEAF_SIZE: int = 4
+
+    def __init__(self, boxes: Iterable[BoundingBox]):
+        self.boxes: List[BoundingBox] = list(boxes)
+        # every node is a tuple of (bounds, left child, right child, box indices),
+        # the children are None for leaves and the indices are None for inner nodes
+        self._nodes: List[Tuple[Any, ...]] = []
+
+        items = [(i, b.asTuple()) for i, b in enumerate(self.boxes) if b.valid]
+        self._root: Optional[int] = self._build(items) if items else None
+
+    def __len__(self) -> int:
+        return len(self.boxes)
+
+    def _build(self, items: List[Tuple[int, Any]]) -> int:
+        bounds = (
+            min(b[0] for i, b in items),
+            min(b[1] for i, b in items),
+            max(b[2] for i, b in items),
+            max(b[3] for i, b in items),
+        )
+
+        if len(items) <= self.LEAF_SIZE:
+            self._nodes.append((bounds, None, None, items))
+            return len(self._nodes) - 1
+
+        # split at the median of the box centers along the longer side
+        axis = 0 if bounds[2] - bounds[0] >= bounds[3] - bounds[1] else 1
+        items = sorted(items, key=lambda item: item[1][axis] + item[1][axis + 2])
+        half = len(items) // 2
+        left = self._build(items[:half])
+        right = self._build(items[half:])
+        self._nodes.append((bounds, left, right, None))
+        return len(self._nodes) - 1
+
+    # Indices of all boxes overlapping the given box (sorted)
+    def queryOverlaps(self, box: BoundingBox) -> List[int]:
+        if self._root is None or not box.valid:
+            return []
+
+        query = box.asTuple()
+        found = []
+        stack = [self._root]
+        while stack:
+            bounds, left, right, items = self._nodes[stack.pop()]
+            if not _boxesOverlap(bounds, query):
+                continue
+            if items is None:
+                stack.append(left)
+                stack.append(right)
+            else:
+                found.extend(i for i, b in items if _boxesOverlap(b, query))
+
+        return sorted(found)
+
+    # All pairs (i, j) with i < j of overlapping boxes (sorted)
+    # Both sides are descended together, so only pairs of nodes with overlapping
+    # bounds are visited instead of testing all n² pairs of boxes
+    def selfOverlaps(self) -> List[Tuple[int, int]]:
+        if self._root is None:
+            return []
+
+        nodes = self._nodes
+        found = []
+        stack = [(self._root, self._root)]
+        while stack:
+            a, b = stack.pop()
+            bounds_a, left_a, right_a, items_a = nodes[a]
+            bounds_b, left_b, right_b, items_b = nodes[b]
+
+            if a == b:
+                if items_a is None:
+                    stack.append((left_a, left_a))
+                    stack.append((right_a, right_a))
+                    stack.append((left_a, right_a))
+                else:
+                    for k, (i, box_i) in enumerate(items_a):
+                        for j, box_j in items_a[k + 1 :]:
+                            if _boxesOverlap(box_i, box_j):
+                                found.append((min(i, j), max(i, j)))
+                continue
+
+            if not _boxesOverlap(bounds_a, bounds_b):
+                continue
+
+            if items_a is not None and items_b is not None:
+                for i, box_i in items_a:
+                    for j, box_j in items_b:
+                        if _boxesOverlap(box_i, box_j):
+                            found.append((min(i, j), max(i, j)))
+            elif items_b is not None or (
+                items_a is None and _area(bounds_a) >= _area(bounds_b)
+            ):
+                # descend the inner node, or the larger one if both are inner nodes
+                stack.append((left_a, b))
+                stack.append((right_a, b))
+            else:
+                stack.append((a, left_b))
+                stack.append((a, right_b))
+
+        return sorted(found)
+
+
 if __name__ == "__main__":
     bb1 = BoundingBox(-20, 50, 10, -20)
     bb2 = BoundingBox(-5, -5, 7, 21)
@@ -151,3 +362,57 @@ if __name__ == "__main__":
     print(bb1.size)
     print(bb2.size)
     print(bb3.size)
+
+    # the batch operations must agree with their single counterparts
+    import random
+
+    random.seed(0)
+    points = [(random.uniform(-9, 9), random.uniform(-9, 9)) for i in range(100)]
+    bb4 = BoundingBox()
+    for x, y in points:
+        bb4.addPoint(x, y, radius=0.5)
+    bb5 = BoundingBox()
+    bb5.addPoints(points, radius=0.5)
+    if bb4.asTuple() != bb5.asTuple():
+        raise ImportError("addPoints and addPoint differ")
+    if numpy is not None:
+        bb5 = BoundingBox()
+        bb5.addPoints(numpy.array(points), radius=0.5)
+        if bb4.asTuple() != bb5.asTuple():
+            raise ImportError("addPoints of an array and addPoint differ")
+
+    boxes = []
+    for i in range(200):
+        x, y = random.uniform(-30, 30), random.uniform(-30, 30)
+        w, h = random.uniform(0, 20), random.uniform(0, 20)
+        boxes.append(BoundingBox(x, y, x + w, y + h))
+    many = bb2.overlapsMany([b.asTuple() for b in boxes])
+    if [bool(m) for m in many] != [bb2.overlaps(b) for b in boxes]:
+        raise ImportError("overlapsMany and overlaps differ")
+    for b in boxes:
+        common = bb2.intersection(b)
+        if common.valid != bb2.overlaps(b):
+            raise ImportError("intersection and overlaps differ")
+        if common.valid and not (
+            bb2.containsPoint(common.xmin, common.ymin)
+            and b.containsPoint(common.xmax, common.ymax)
+        ):
+            raise ImportError("intersection is not inside both boxes")
+    if bb1.union(bb2).asTuple() != (-20, -20, 10, 50):
+        raise ImportError("wrong union")
+
+    # the tree must find the same overlaps as testing all pairs
+    boxes.append(BoundingBox())
+    tree = BoundingBoxTree(boxes)
+    pairs = [
+        (i, j)
+        for i in range(len(boxes))
+        for j in range(i + 1, len(boxes))
+        if boxes[i].overlaps(boxes[j])
+    ]
+    if tree.selfOverlaps() != pairs:
+        raise ImportError("overlaps of the tree and of all pairs differ")
+    for b in [bb1, bb2, bb3, BoundingBox()]:
+        expected = [i for i, c in enumerate(boxes) if b.overlaps(c)]
+        if tree.queryOverlaps(b) != expected:
+            raise ImportError("query of the tree and overlaps differ")
@@ -2,52 +2,370 @@
 Library for handling KiCad's footprint files (`*.kicad_mod`).
 """
 
-import copy
 import math
+import os
 import time
-from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+import uuid
+from collections.abc import Mapping
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 
 import sexpr
 from boundingbox import BoundingBox
+from transform import Transform
+
+# numpy is optional, it is only needed for the array views of the geometry
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# Numeric codes of the pad shapes, used in the shape column of KicadMod.padArray()
+PAD_SHAPE_CODES: Dict[str, int] = {
+    "circle": 0,
+    "rect": 1,
+    "oval": 2,
+    "trapezoid": 3,
+    "roundrect": 4,
+    "custom": 5,
+}
+
+
+# Convert mm to nanometers, the internal unit of KiCad
+def mmToNanoMeter(mm: float) -> int:
+    return round(mm * 1e6)
+
+
+# Convert nanometers back to mm, the unit of the files
+def nanoMeterToMm(nm: int) -> float:
+    return nm / 1e6
+
+
+# Exact (and hashable) key of a point, its coordinates in nanometers
+def pointKey(point: Dict[str, float]) -> Tuple[int, int]:
+    return mmToNanoMeter(point["x"]), mmToNanoMeter(point["y"])
+
+
+# The values which differ between two parsed items of the same structure, as
+# (path, index, old value, new value). The path leads to the list holding the
+# value, as (key, n) steps for the n-th list with that key.
+# Returns None if the structure differs, e.g. an item got more points.
+def _valueChanges(
+    old: List[Any], new: List[Any], path: Tuple[Tuple[str, int], ...] = ()
+) -> Optional[List[Tuple[Tuple[Tuple[str, int], ...], int, Any, Any]]]:
+    if len(old) != len(new):
+        return None
+
+    changes = []
+    for i, (a, b) in enumerate(zip(old, new)):
+        if isinstance(a, list) or isinstance(b, list):
+            if not (isinstance(a, list) and isinstance(b, list)):
+                return None
+            if not a or not b or a[0] != b[0]:
+                return None
+            n = len([c for c in old[:i] if isinstance(c, list) and c and c[0] == a[0]])
+            sub = _valueChanges(a, b, path + ((a[0], n),))
+            if sub is None:
+                return None
+            changes += sub
+        elif a != b:
+            changes.append((path, i, a, b))
+    return changes
+
+
+# The lists with the given key in a list parsed by sexpr.parse_sexp_spans(),
+# its direct children or else the ones further down (e.g. the width is in the
+# stroke of newer files)
+def _findLists(node: sexpr.SpanList, key: str) -> List[sexpr.SpanList]:
+    def isKey(c: Any) -> bool:
+        return isinstance(c, list) and bool(c) and c[0].value == key
+
+    found = [c for c in node if isKey(c)]
+    if found:
+        return found
+
+    for c in node:
+        if isinstance(c, list):
+            found += _findLists(c, key)
+    return found
+
+
+# Apply the changes of _valueChanges() to the text of an item, everything else
+# (formatting, stroke type, uuid, ...) is kept. With new_uuid the uuid (or
+# tstamp) is replaced, for copies of an item.
+# Returns None if a changed value can not be found in the text.
+def _patchValues(text: str, changes, new_uuid: bool = False) -> Optional[str]:
+    tree = sexpr.parse_sexp_spans(text)
+
+    edits = []
+    for path, i, old, new in changes:
+        node = tree
+        for key, n in path:
+            lists = _findLists(node, key)
+            if n >= len(lists):
+                return None
+            node = lists[n]
+
+        if i >= len(node) or isinstance(node[i], list) or node[i].value != old:
+            return None
+        if node[i].quoted:
+            value = '"%s"' % str(new).replace('"', r"\"")
+        else:
+            value = sexpr.SexprItem(new)
+        edits.append((node[i].start, node[i].end, value))
+
+    if new_uuid:
+        for key in ["uuid", "tstamp"]:
+            for node in _findLists(tree, key):
+                if len(node) > 1 and not isinstance(node[1], list):
+                    value = str(uuid.uuid4())
+                    if node[1].quoted:
+                        value = '"%s"' % value
+                    edits.append((node[1].start, node[1].end, value))
+
+    for start, end, value in sorted(edits, reverse=True):
+        text = text[:start] + value + text[end:]
+    return text
+
+
+# Center of the circle through the start, mid and end point of an arc
+# Raises ZeroDivisionError if the three points are on a straight line
+def _arcCenter(
+    start: Dict[str, float], mid: Dict[str, float], end: Dict[str, float]
+) -> Tuple[float, float]:
+
+    # make readable names
+    p1x = start["x"]
+    p1y = start["y"]
+    p2x = mid["x"]
+    p2y = mid["y"]
+    p3x = end["x"]
+    p3y = end["y"]
+
+    if math.sqrt((p1x - p3x)**2 + (p1y - p3y)**2) < 1e-7:
+        # start and end points match --> center is half way between
+        # start(=end) and mid
+        return 0.5 * (p1x + p2x), 0.5 * (p1y + p2y)
+
+    # make square names
+    p1x_2 = p1x * p1x
+    p1y_2 = p1y * p1y
+    p2x_2 = p2x * p2x
+    p2y_2 = p2y * p2y
+    p3x_2 = p3x * p3x
+    p3y_2 = p3y * p3y
+
+    # Calculte coordinates of the Center (rx,ry) from the three points
+    # using formula found on http://ambrsoft.com/TrigoCalc/Circle3D.htm
+    A = 2 * (p1x * (p2y - p3y) - p1y * (p2x - p3x) + p2x * p3y - p3x * p2y)
+    rx = (
+        ((p1x_2 + p1y_2) * (p2y - p3y))
+        + ((p2x_2 + p2y_2) * (p3y - p1y))
+        + ((p3x_2 + p3y_2) * (p1y - p2y))
+    ) / A
+    ry = (
+        ((p1x_2 + p1y_2) * (p3x - p2x))
+        + ((p2x_2 + p2y_2) * (p1x - p3x))
+        + ((p3x_2 + p3y_2) * (p2x - p1x))
+    ) / A
+
+    return rx, ry
+
+
+# Angle (in radians) between the start and the end point of an arc, seen from its center
+def _arcAngle(
+    start: Dict[str, float], mid: Dict[str, float], end: Dict[str, float]
+) -> float:
+    rx, ry = _arcCenter(start, mid, end)
+
+    # Then get diff between  vectors End-Center, Start-Center
+    Diff = math.atan2(end["y"] - ry, end["x"] - rx) - math.atan2(
+        start["y"] - ry, start["x"] - rx
+    )
+
+    #  Diff is always the shorter angle, ignoring Mid. Need to adjust
+    if Diff < 0.0:
+        Diff = 2 * math.pi + Diff
+
+    return Diff
+
+
+# The end points of the arc from start through mid to end, together with every cardinal
+# point of its circle (0, 90, 180 and 270 degrees) that is passed by the arc
+# These are the points which give the exact bounds of the arc
+def _arcExtremes(
+    start: Dict[str, float], mid: Dict[str, float], end: Dict[str, float]
+) -> List[Tuple[float, float]]:
+
+    points = [(start["x"], start["y"]), (end["x"], end["y"])]
+
+    try:
+        cx, cy = _arcCenter(start, mid, end)
+    except ZeroDivisionError:
+        # the three points are on a straight line
+        points.append((mid["x"], mid["y"]))
+        return points
+
+    r = math.hypot(start["x"] - cx, start["y"] - cy)
+
+    # all angles are measured counter-clockwise from the start point
+    alpha = math.atan2(start["y"] - cy, start["x"] - cx)
+    full = math.hypot(end["x"] - start["x"], end["y"] - start["y"]) < 1e-7
+    sweep_end = (math.atan2(end["y"] - cy, end["x"] - cx) - alpha) % (2 * math.pi)
+    sweep_mid = (math.atan2(mid["y"] - cy, mid["x"] - cx) - alpha) % (2 * math.pi)
+
+    # if mid is not between start and end, the arc goes the other way round
+    ccw = sweep_mid <= sweep_end
+
+    for i, (dx, dy) in enumerate([(1, 0), (0, 1), (-1, 0), (0, -1)]):
+        sweep = (i * math.pi / 2 - alpha) % (2 * math.pi)
+        if full or (sweep <= sweep_end if ccw else sweep >= sweep_end):
+            points.append((cx + r * dx, cy + r * dy))
+
+    return points
+
+
+# Exact bounds (xmin, ymin, xmax, ymax) of the arc from start through mid to end
+def _arcBounds(
+    start: Dict[str, float], mid: Dict[str, float], end: Dict[str, float]
+) -> Tuple[float, float, float, float]:
+
+    points = _arcExtremes(start, mid, end)
+    xs = [x for x, y in points]
+    ys = [y for x, y in points]
+
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+# Pads are looked up by their number, regardless of its type and case
+def _padKey(number: Union[str, int]) -> str:
+    return str(number).upper()
+
+
+# Corners of a rect with the given half sizes, centered on (0, 0)
+def _rectCorners(sx: float, sy: float) -> List[Tuple[float, float]]:
+    return [(-sx, -sy), (-sx, sy), (sx, sy), (sx, -sy)]
+
+
+# Outline of a pad in footprint coordinates, see KicadMod.padOutline()
+def _padOutline(pad: Dict[str, Any]) -> List[Tuple[List[Tuple[float, float]], float]]:
+    pos = pad["pos"]
+    t = Transform().rotate(-pos["orientation"]).translate(pos["x"], pos["y"])
+
+    # half sizes
+    sx = pad["size"]["x"] / 2
+    sy = pad["size"]["y"] / 2
+
+    # custom pads are made of their anchor pad and the primitives
+    shape = pad["shape"]
+    if shape == "custom":
+        shape = "circle" if pad["options"]["anchor"] == "circle" else "rect"
+
+    parts = []
+    if shape == "circle":
+        parts.append(([(0, 0)], sx))
+    elif shape == "oval":
+        # the segment between the centers of both rounded ends
+        r = min(sx, sy)
+        parts.append(([(r - sx, r - sy), (sx - r, sy - r)], r))
+    elif shape == "roundrect":
+        r = min(pad["roundrect_rratio"] or 0, 0.5) * 2 * min(sx, sy)
+        parts.append((_rectCorners(sx - r, sy - r), r))
+    elif shape == "trapezoid":
+        # same corners as in KiCad's PAD::TransformShapeToPolygon
+        dx, dy = [d / 2 for d in pad["rect_delta"] or [0, 0]]
+        corners = [
+            (-sx - dy, sy + dx),
+            (sx + dy, sy - dx),
+            (sx - dy, -sy + dx),
+            (-sx + dy, -sy - dx),
+        ]
+        parts.append((corners, 0))
+    else:
+        parts.append((_rectCorners(sx, sy), 0))
+
+    arcs = []
+    for p in pad.get("primitives", []):
+        w = (p["width"] or 0) / 2
+        if p["type"] == "gr_poly":
+            parts.append(([(pt["x"], pt["y"]) for pt in p["pts"]], w))
+        elif p["type"] == "gr_line":
+            s, e = p["start"], p["end"]
+            parts.append(([(s["x"], s["y"]), (e["x"], e["y"])], w))
+        elif p["type"] == "gr_circle":
+            c, e = p["center"], p["end"]
+            r = math.hypot(e["x"] - c["x"], e["y"] - c["y"])
+            parts.append(([(c["x"], c["y"])], r + w))
+        elif p["type"] == "gr_arc":
+            arcs.append(p)
+
+    outline = [([t.apply(x, y) for x, y in points], r) for points, r in parts]
+
+    # the extreme points of arcs depend on the orientation, so they are
+    # only calculated in footprint coordinates
+    for p in arcs:
+        points = [t.apply(p[key]["x"], p[key]["y"]) for key in ["start", "mid", "end"]]
+        start, mid, end = [{"x": x, "y": y} for x, y in points]
+        outline.append((_arcExtremes(start, mid, end), (p["width"] or 0) / 2))
+
+    return outline
+
+
+class Segment(Mapping):
+    """
+    An immutable straight edge of a rect or polygon
 
+    It can be read like a line dict (start, end, layer, width). The start and
+    end points of polygon edges are the points of the polygon itself, so they
+    must not be modified. Changes have to be applied to `source` instead,
+    the rect or polygon dict the edge belongs to.
+    """
 
-# Rotate a point by given angle (in degrees)
-def _rotatePoint(point: Dict[str, float], degrees: float) -> Dict[str, float]:
-
-    # @todo Does not copy! Only reference objects are compiled but not the real object!
-    # Create a new point (copy)
-    p = {}
-    for key in point:
-        p[key] = point[key]
-
-    radians = degrees * math.pi / 180
-
-    x = point["x"]
-    y = point["y"]
-
-    p["x"] = x * math.cos(radians) - y * math.sin(radians)
-    p["y"] = y * math.cos(radians) + x * math.sin(radians)
-
-    if "orientation" in point:
-        p["orientation"] -= degrees
+    __slots__ = ("start", "end", "layer", "width", "source")
 
-    return p
+    _keys = ("start", "end", "layer", "width")
 
+    def __init__(
+        self,
+        start: Dict[str, float],
+        end: Dict[str, float],
+        layer: str,
+        width: float,
+        source: Dict[str, Any],
+    ):
+        object.__setattr__(self, "start", start)
+        object.__setattr__(self, "end", end)
+        object.__setattr__(self, "layer", layer)
+        object.__setattr__(self, "width", width)
+        object.__setattr__(self, "source", source)
 
-# Move point by certain offset
-def _movePoint(point: Dict[str, float], offset: Dict[str, float]) -> Dict[str, float]:
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("Segment is immutable, modify its source instead")
 
-    # @todo Does not copy! Only reference objects are compiled but not the real object!
-    # Copy all points
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._keys:
+            raise KeyError(key)
+        return getattr(self, key)
 
-    p = {}
-    for key in point:
-        p[key] = point[key]
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys)
 
-    p["x"] += offset["x"]
-    p["y"] += offset["y"]
+    def __len__(self) -> int:
+        return len(self._keys)
 
-    return p
+    def __repr__(self) -> str:
+        return "Segment({})".format(dict(self))
 
 
 class KicadMod:
@@ -57,21 +375,73 @@ class KicadMod:
 
     SEXPR_BOARD_FILE_VERSION = 20210108
 
-    def __init__(self, filename: str=None, data=None):
+    # Top-level s-expression keys of the sections that can be loaded on their own
+    SECTIONS: Dict[str, List[str]] = {
+        "attr": ["attr"],
+        "texts": ["fp_text", "property"],
+        "lines": ["fp_line"],
+        "rects": ["fp_rect"],
+        "circles": ["fp_circle"],
+        "polys": ["fp_poly"],
+        "arcs": ["fp_arc"],
+        "pads": ["pad"],
+        "models": ["model"],
+    }
+
+    # The sections holding the graphical items
+    GRAPHIC_SECTIONS: FrozenSet[str] = frozenset(
+        ["lines", "rects", "circles", "polys", "arcs"]
+    )
+
+    # The header values are small, they are always loaded
+    HEADER_KEYS: List[str] = [
+        "version",
+        "generator",
+        "layer",
+        "locked",
+        "descr",
+        "tags",
+        "autoplace_cost90",
+        "autoplace_cost180",
+        "clearance",
+        "solder_mask_margin",
+        "solder_paste_margin",
+        "solder_paste_ratio",
+        "tedit",
+    ]
+
+    def __init__(
+        self,
+        filename: str = None,
+        data=None,
+        sections: Optional[Iterable[str]] = None,
+        release_tree: bool = False,
+        nanometers: bool = False,
+    ):
         self.filename: str = filename
 
-        if data is not None:
-            sexpr_data = data
-        elif filename:
-            # read the s-expression data
-            with open(filename) as f:
-                sexpr_data = f.read()
-        else:
+        # all lengths are stored as integer nanometers instead of mm, see
+        # _convertUnits(). The files are still written in mm. The rules and
+        # their tolerances expect mm, so the checkers do not use this mode.
+        self.nanometers: bool = False
+
+        # the loaded sections (see SECTIONS), None if the whole footprint is loaded
+        self.sections: Optional[set] = None
+        if sections is not None:
+            self.sections = set(sections)
+            unknown = self.sections - self.SECTIONS.keys()
+            if unknown:
+                raise ValueError("Unknown sections: " + ", ".join(sorted(unknown)))
+
+        # derived geometry (arrays, bounding boxes), see invalidateCache()
+        self._cache: Dict[Any, Any] = {}
+
+        if data is None and not filename:
             raise ValueError('Either filename or data must be given.')
 
-        # parse s-expr
-        sexpr_data = sexpr.parse_sexp(sexpr_data)
-        self.sexpr_data = sexpr_data
+        # the s-expression data is parsed on first access, see sexpr_data
+        self._source: Optional[str] = data
+        self._sexpr_data = None
 
         # module name
         self.name: str = str(self.sexpr_data[1])
@@ -88,6 +458,9 @@ class KicadMod:
         # locked flag
         self.locked = self._getValue("locked", False, 2)
 
+        # last edit timestamp (only in older files)
+        self.tedit = self._getValue("tedit", None, 2)
+
         # description
         self.description = self._getValue("descr", "", 2)
 
@@ -105,13 +478,19 @@ class KicadMod:
         self.solder_paste_ratio = self._getValue("solder_paste_ratio", 0, 2)
 
         # attribute
-        self._getAttributes()
+        self.attribute = None
+        if self.hasSection("attr"):
+            self._getAttributes()
 
         # reference
-        self.reference = self._getText("reference")[0]
+        self.reference = None
+        if self.hasSection("texts"):
+            self.reference = self._getText("reference")[0]
 
         # value
-        self.value = self._getText("value")[0]
+        self.value = None
+        if self.hasSection("texts"):
+            self.value = self._getText("value")[0]
 
         # user text
         self.userText: List[Dict[str, Any]] = self._getText("user")
@@ -137,6 +516,47 @@ class KicadMod:
         # models
         self.models = self._getModels()
 
+        if nanometers:
+            self._convertUnits(mmToNanoMeter)
+            self.nanometers = True
+
+        # everything has been decoded, the tree can be released to save memory
+        # if it is needed later, it is parsed again from the file (or data)
+        if release_tree:
+            self._sexpr_data = None
+
+    # The parsed s-expression data, only the loaded sections are included
+    @property
+    def sexpr_data(self):
+        if self._sexpr_data is None:
+            self._sexpr_data = self._parse()
+        return self._sexpr_data
+
+    @sexpr_data.setter
+    def sexpr_data(self, value) -> None:
+        self._sexpr_data = value
+
+    def _parse(self):
+        if self._source is not None:
+            data = self._source
+        else:
+            # read the s-expression data
+            with open(self.filename) as f:
+                data = f.read()
+
+        # parse s-expr, skip the sections which are not needed
+        if self.sections is None:
+            return sexpr.parse_sexp(data)
+
+        keys = set(self.HEADER_KEYS)
+        for section in self.sections:
+            keys.update(self.SECTIONS[section])
+        return sexpr.parse_sexp_sections(data, keys)
+
+    # check if a section has been loaded, the other sections are left empty
+    def hasSection(self, section: str) -> bool:
+        return self.sections is None or section in self.sections
+
     # check if value exists in any element of data
     def _hasValue(self, data: Iterable[Any], value: str) -> bool:
         for i in data:
@@ -396,52 +816,10 @@ class KicadMod:
                 a = self._getArray(arc, "mid")[0]
                 arc_dict["mid"] = {"x": a[1], "y": a[2]}
 
-                # make readable names
-                p1x = arc_dict["start"]["x"]
-                p1y = arc_dict["start"]["y"]
-                p2x = arc_dict["mid"]["x"]
-                p2y = arc_dict["mid"]["y"]
-                p3x = arc_dict["end"]["x"]
-                p3y = arc_dict["end"]["y"]
-
-                if math.sqrt((p1x - p3x)**2 + (p1y - p3y)**2) < 1e-7:
-                    # start and end points match --> center is half way between
-                    # start(=end) and mid
-                    rx, ry = 0.5 * (p1x + p2x), 0.5 * (p1y + p2y)
-                else:
-                    # make square names
-                    p1x_2 = p1x * p1x
-                    p1y_2 = p1y * p1y
-                    p2x_2 = p2x * p2x
-                    p2y_2 = p2y * p2y
-                    p3x_2 = p3x * p3x
-                    p3y_2 = p3y * p3y
-
-                    # Calculte coordinates of the Center (rx,ry) from the three points
-                    # using formula found on http://ambrsoft.com/TrigoCalc/Circle3D.htm
-                    A = 2 * (p1x * (p2y - p3y) - p1y * (p2x - p3x) + p2x * p3y - p3x * p2y)
-                    rx = (
-                        ((p1x_2 + p1y_2) * (p2y - p3y))
-                        + ((p2x_2 + p2y_2) * (p3y - p1y))
-                        + ((p3x_2 + p3y_2) * (p1y - p2y))
-                    ) / A
-                    ry = (
-                        ((p1x_2 + p1y_2) * (p3x - p2x))
-                        + ((p2x_2 + p2y_2) * (p1x - p3x))
-                        + ((p3x_2 + p3y_2) * (p2x - p1x))
-                    ) / A
-
-                # Then get diff between  vectors End-Center, Start-Center
-                Diff = math.atan2(p3y - ry, p3x - rx) - math.atan2(p1y - ry, p1x - rx)
-                # print ("\nangle =" , math.degrees( Diff ))
-
-                #  Diff is always the shorter angle, ignoring Mid. Need to adjust
-                if Diff < 0.0:
-                    Diff = 2 * math.pi + Diff
-
-                # print ("\n corrected angle =" , math.degrees( Diff ))
-
-                arc_dict["angle"] = Diff
+                arc_dict["angle"] = _arcAngle(
+                    arc_dict["start"], arc_dict["mid"], arc_dict["end"]
+                )
+
                 try:
                     a = self._getArray(arc, "layer")[0]
                     arc_dict["layer"] = a[1]
@@ -719,6 +1097,7 @@ class KicadMod:
         # rotate
         model_dict["rotate"] = {"x": rotate[0], "y": rotate[1], "z": rotate[2]}
         self.models.append(model_dict)
+        self.invalidateCache()
 
     def addLine(
         self, start: List[float], end: List[float], layer: str, width: float
@@ -730,6 +1109,7 @@ class KicadMod:
             "width": width,
         }
         self.lines.append(line)
+        self.invalidateCache()
 
     def addRectangle(
         self, start: List[float], end: List[float], layer: str, width: float
@@ -740,85 +1120,162 @@ class KicadMod:
         self.addLine([end[0], end[1]], [start[0], end[1]], layer, width)
 
     def setAnchor(self, anchor_point: List[float]) -> None:
-        # change reference position
-        self.reference["pos"]["x"] -= anchor_point[0]
-        self.reference["pos"]["y"] -= anchor_point[1]
+        self.transform(Transform().translate(-anchor_point[0], -anchor_point[1]))
 
-        # change value position
-        self.value["pos"]["x"] -= anchor_point[0]
-        self.value["pos"]["y"] -= anchor_point[1]
+    def rotateFootprint(self, degrees: float):
+        self.transform(Transform().rotate(degrees))
 
-        # change user text position
-        for text in self.userText:
-            text["pos"]["x"] -= anchor_point[0]
-            text["pos"]["y"] -= anchor_point[1]
+    # Apply a transformation (see transform.Transform) to all footprint items
+    def transform(self, t: Transform) -> None:
+        self.invalidateCache()
+
+        # collect all points first, they are transformed in a single pass
+        points = []
 
-        # change lines position
+        # texts
+        for text in [self.reference, self.value] + self.userText:
+            points.append(text["pos"])
+            text["pos"]["orientation"] = t.applyOrientation(text["pos"]["orientation"])
+
+        # lines and circles
         for line in self.lines:
-            line["start"]["x"] -= anchor_point[0]
-            line["end"]["x"] -= anchor_point[0]
-            line["start"]["y"] -= anchor_point[1]
-            line["end"]["y"] -= anchor_point[1]
+            points += [line["start"], line["end"]]
 
-        # change circles position
         for circle in self.circles:
-            circle["center"]["x"] -= anchor_point[0]
-            circle["end"]["x"] -= anchor_point[0]
-            circle["center"]["y"] -= anchor_point[1]
-            circle["end"]["y"] -= anchor_point[1]
-
-        # change arcs position
-        for arc in self.arcs:
-            arc["start"]["x"] -= anchor_point[0]
-            arc["end"]["x"] -= anchor_point[0]
-            arc["start"]["y"] -= anchor_point[1]
-            arc["end"]["y"] -= anchor_point[1]
+            points += [circle["center"], circle["end"]]
+
+        # rects stay rects if they stay axis aligned, otherwise they become lines
+        if not t.isAxisAligned:
+            for rect in self.rects:
+                start = [rect["start"]["x"], rect["start"]["y"]]
+                end = [rect["end"]["x"], rect["end"]["y"]]
+                self.addRectangle(start, end, rect["layer"], rect["width"])
+                points += [line["start"] for line in self.lines[-4:]]
+                points += [line["end"] for line in self.lines[-4:]]
+            self.rects = []
 
-        # change pads positions
-        for pad in self.pads:
-            pad["pos"]["x"] -= anchor_point[0]
-            pad["pos"]["y"] -= anchor_point[1]
+        for rect in self.rects:
+            points += [rect["start"], rect["end"]]
 
-        # change models
-        for model in self.models:
-            model["pos"]["x"] -= anchor_point[0] / 25.4
-            model["pos"]["y"] += anchor_point[1] / 25.4
+        # arcs and polygons
+        for arc in self.arcs:
+            points += [arc["start"], arc["mid"], arc["end"]]
 
-    def rotateFootprint(self, degrees: float):
-        # change reference position
-        self.reference["pos"] = _rotatePoint(self.reference["pos"], degrees)
+        for poly in self.polys:
+            points += poly["points"]
 
-        # change value position
-        self.value["pos"] = _rotatePoint(self.value["pos"], degrees)
+        # pads, custom primitives are relative to the pad and follow its orientation
+        for pad in self.pads:
+            points.append(pad["pos"])
+            pad["pos"]["orientation"] = t.applyOrientation(pad["pos"]["orientation"])
 
-        # change user text position
-        for text in self.userText:
-            text["pos"] = _rotatePoint(text["pos"], degrees)
+            if t.mirrored:
+                self._mirrorPad(pad)
 
-        # change lines position
-        for line in self.lines:
-            line["start"] = _rotatePoint(line["start"], degrees)
-            line["end"] = _rotatePoint(line["end"], degrees)
+        t.applyPoints(points)
 
-        # change circles position
-        for circle in self.circles:
-            circle["center"] = _rotatePoint(circle["center"], degrees)
-            circle["end"] = _rotatePoint(circle["end"], degrees)
+        # the points stay whole nanometers
+        if self.nanometers:
+            for p in points:
+                p["x"] = round(p["x"])
+                p["y"] = round(p["y"])
+
+        # the angle of mirrored arcs goes the other way round
+        if t.mirrored:
+            for arc in self.arcs:
+                arc["angle"] = _arcAngle(arc["start"], arc["mid"], arc["end"])
+
+        # models are placed in inches, with the y axis pointing up
+        a, b, c, d = t.matrix
+        tx, ty = t.offset
+        inch = 25.4e6 if self.nanometers else 25.4
+        model_t = Transform((a, -b, -c, d), (tx / inch, -ty / inch))
+        for model in self.models:
+            pos = model["pos"]
+            pos["x"], pos["y"] = model_t.apply(pos["x"], pos["y"])
+            model["rotate"]["z"] = t.applyOrientation(model["rotate"]["z"])
+            if t.mirrored:
+                model["scale"]["y"] = -model["scale"]["y"]
+
+    # Mirror the pad local items (y -> -y), the pad orientation is handled by transform()
+    def _mirrorPad(self, pad: Dict[str, Any]) -> None:
+        if pad["rect_delta"]:
+            pad["rect_delta"] = [pad["rect_delta"][0], -pad["rect_delta"][1]]
+
+        if pad["drill"] and pad["drill"]["offset"]:
+            pad["drill"]["offset"]["y"] = -pad["drill"]["offset"]["y"]
+
+        for p in pad.get("primitives", []):
+            points = p.get("pts", []) + [
+                p[key] for key in ["start", "mid", "end", "center"] if p.get(key)
+            ]
+            for point in points:
+                point["y"] = -point["y"]
+
+    # Convert all lengths (positions, sizes, widths, margins) of the footprint
+    # with convert, e.g. mmToNanoMeter. The 3D models are placed in inches and
+    # are left as they are.
+    def _convertUnits(self, convert: Callable[[float], Any]) -> None:
+        self.invalidateCache()
+
+        # values which are not given are None, "" or {} instead of a number
+        def isNumber(v: Any) -> bool:
+            return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+        def value(item: Dict[str, Any], key: str) -> None:
+            if isNumber(item.get(key)):
+                item[key] = convert(item[key])
+
+        def point(p: Optional[Dict[str, Any]]) -> None:
+            if p:
+                value(p, "x")
+                value(p, "y")
+
+        for key in ["clearance", "solder_mask_margin", "solder_paste_margin"]:
+            if isNumber(getattr(self, key)):
+                setattr(self, key, convert(getattr(self, key)))
+
+        for text in [self.reference, self.value] + self.userText:
+            if text:
+                point(text["pos"])
+                for key in ["height", "width", "thickness"]:
+                    value(text["font"], key)
+
+        for graph in self.lines + self.rects + self.circles + self.arcs:
+            for key in ["start", "mid", "end", "center"]:
+                point(graph.get(key))
+            value(graph, "width")
 
-        # change arcs position
-        for arc in self.arcs:
-            arc["start"] = _rotatePoint(arc["start"], degrees)
-            arc["mid"] = _rotatePoint(arc["mid"], degrees)
-            arc["end"] = _rotatePoint(arc["end"], degrees)
+        for poly in self.polys:
+            for p in poly["points"]:
+                point(p)
+            value(poly, "width")
 
-        # change pads positions
         for pad in self.pads:
-            pad["pos"] = _rotatePoint(pad["pos"], degrees)
-
-        # change models
-        for model in self.models:
-            model["pos"] = _rotatePoint(model["pos"], -degrees)
-            model["rotate"]["z"] = model["rotate"]["z"] - degrees
+            point(pad["pos"])
+            point(pad["size"])
+            if pad["drill"]:
+                point(pad["drill"]["offset"])
+                point(pad["drill"]["size"])
+            if pad["rect_delta"]:
+                pad["rect_delta"] = [convert(v) for v in pad["rect_delta"]]
+            for key in [
+                "die_length",
+                "clearance",
+                "solder_mask_margin",
+                "solder_paste_margin",
+                "thermal_width",
+                "thermal_gap",
+            ]:
+                value(pad, key)
+            if "options" in pad:
+                value(pad["options"], "clearance")
+            for p in pad.get("primitives", []):
+                for pt in p.get("pts", []):
+                    point(pt)
+                for key in ["start", "mid", "end", "center"]:
+                    point(p.get(key))
+                value(p, "width")
 
     def filterLines(self, layer: str) -> List[Dict[str, Any]]:
         lines = []
@@ -828,36 +1285,47 @@ class KicadMod:
 
         return lines
 
-    def filterRectsAsLines(self, layer: str) -> List[Dict[str, Any]]:
+    def filterRectsAsLines(self, layer: str) -> List[Segment]:
+        # the segments are cached per layer, only the list is new
+        segments = self._cached(
+            ("rectSegments", layer), lambda: self._rectSegments(layer)
+        )
+        return list(segments)
+
+    def _rectSegments(self, layer: str) -> List[Segment]:
         lines = []
-        for rect in self.rects:
-            if rect["layer"] == layer:
-                # convert the rect to 4 lines
-                l0 = copy.deepcopy(rect)
-                l1 = copy.deepcopy(rect)
-                l2 = copy.deepcopy(rect)
-                l3 = copy.deepcopy(rect)
-                l0["end"]["x"] = rect["start"]["x"]
-                l1["end"]["y"] = rect["start"]["y"]
-                l2["start"]["x"] = rect["end"]["x"]
-                l3["start"]["y"] = rect["end"]["y"]
-                lines.extend([l0, l1, l2, l3])
+        for rect in self.filterRects(layer):
+            # convert the rect to 4 lines
+            start = rect["start"]
+            end = rect["end"]
+            corner1 = {"x": start["x"], "y": end["y"]}
+            corner2 = {"x": end["x"], "y": start["y"]}
+            width = rect["width"]
+            lines.extend(
+                [
+                    Segment(start, corner1, layer, width, rect),
+                    Segment(start, corner2, layer, width, rect),
+                    Segment(corner2, end, layer, width, rect),
+                    Segment(corner1, end, layer, width, rect),
+                ]
+            )
 
         return lines
 
-    def filterPolysAsLines(self, layer: str) -> List[Dict[str, Any]]:
+    def filterPolysAsLines(self, layer: str) -> List[Segment]:
+        segments = self._cached(
+            ("polySegments", layer), lambda: self._polySegments(layer)
+        )
+        return list(segments)
+
+    def _polySegments(self, layer: str) -> List[Segment]:
         lines = []
-        for poly in self.polys:
-            if poly["layer"] == layer:
-                for i in range(len(poly["points"])):
-                    lines.append(
-                        {
-                            "start": copy.copy(poly["points"][i]),
-                            "end": copy.copy(poly["points"][i - 1]),
-                            "layer": copy.copy(poly["layer"]),
-                            "width": copy.copy(poly["width"]),
-                        }
-                    )
+        for poly in self.filterPolys(layer):
+            points = poly["points"]
+            for i in range(len(points)):
+                lines.append(
+                    Segment(points[i], points[i - 1], layer, poly["width"], poly)
+                )
         return lines
 
     def filterRects(self, layer: str) -> List[Dict[str, Any]]:
@@ -892,26 +1360,127 @@ class KicadMod:
 
         return arcs
 
+    # Drop all cached geometry
+    # Must be called after the dicts (lines, pads, ...) were modified directly
+    def invalidateCache(self) -> None:
+        self._cache.clear()
+
+    def _cached(self, key, builder):
+        if key not in self._cache:
+            self._cache[key] = builder()
+        return self._cache[key]
+
+    def _toArray(self, rows: List[Tuple[float, ...]], columns: int):
+        if numpy is None:
+            raise ImportError("numpy is required for the array views of KicadMod")
+
+        array = numpy.array(rows, dtype=float).reshape(-1, columns)
+        # the array is shared through the cache, so it must not be changed
+        array.flags.writeable = False
+        return array
+
+    # Lines of a layer as N×4 array of (x1, y1, x2, y2)
+    def lineArray(self, layer: str):
+        return self._cached(
+            ("lines", layer),
+            lambda: self._toArray(
+                [
+                    (l["start"]["x"], l["start"]["y"], l["end"]["x"], l["end"]["y"])
+                    for l in self.filterLines(layer)
+                ],
+                4,
+            ),
+        )
+
+    # Rects of a layer as N×4 array of (x1, y1, x2, y2)
+    def rectArray(self, layer: str):
+        return self._cached(
+            ("rects", layer),
+            lambda: self._toArray(
+                [
+                    (r["start"]["x"], r["start"]["y"], r["end"]["x"], r["end"]["y"])
+                    for r in self.filterRects(layer)
+                ],
+                4,
+            ),
+        )
+
+    # Circles of a layer as N×3 array of (cx, cy, radius)
+    def circleArray(self, layer: str):
+        return self._cached(
+            ("circles", layer),
+            lambda: self._toArray(
+                [
+                    (
+                        c["center"]["x"],
+                        c["center"]["y"],
+                        math.hypot(
+                            c["end"]["x"] - c["center"]["x"],
+                            c["end"]["y"] - c["center"]["y"],
+                        ),
+                    )
+                    for c in self.filterCircles(layer)
+                ],
+                3,
+            ),
+        )
+
+    # All pads as N×6 array of (x, y, width, height, orientation, shape code)
+    # The shape codes are listed in PAD_SHAPE_CODES, unknown shapes are -1
+    def padArray(self):
+        return self._cached(
+            ("pads",),
+            lambda: self._toArray(
+                [
+                    (
+                        p["pos"]["x"],
+                        p["pos"]["y"],
+                        p["size"]["x"],
+                        p["size"]["y"],
+                        p["pos"]["orientation"],
+                        PAD_SHAPE_CODES.get(p["shape"], -1),
+                    )
+                    for p in self.pads
+                ],
+                6,
+            ),
+        )
+
     # Return the geometric bounds for a given layer
     # Includes lines, arcs, circles, rects
     def geometricBoundingBox(self, layer: str) -> BoundingBox:
+        # the bounds are cached per layer, callers get their own BoundingBox
+        bounds = self._cached(("bounds", layer), lambda: self._geometricBounds(layer))
+        return BoundingBox(*bounds)
+
+    def _geometricBounds(
+        self, layer: str
+    ) -> Tuple[Optional[float], Optional[float], Optional[float], Optional[float]]:
 
         bb = BoundingBox()
 
-        # Add all lines
-        lines = self.filterLines(layer)
-        for line in lines:
-            bb.addPoint(line["start"]["x"], line["start"]["y"])
-            bb.addPoint(line["end"]["x"], line["end"]["y"])
+        if numpy is not None:
+            # Add all lines and rects
+            for a in [self.lineArray(layer), self.rectArray(layer)]:
+                bb.addPoints(a.reshape(-1, 2))
 
-        # Add all rects
-        rects = self.filterRects(layer)
-        for r in rects:
-            bb.addPoint(r["start"]["x"], r["start"]["y"])
-            bb.addPoint(r["end"]["x"], r["end"]["y"])
+            # Add all circles
+            a = self.circleArray(layer)
+            if len(a):
+                bb.addPoints(a[:, :2] - a[:, 2:3])
+                bb.addPoints(a[:, :2] + a[:, 2:3])
+
+            circles = []
+        else:
+            # Add all lines
+            # Add all lines and rects
+            for item in self.filterLines(layer) + self.filterRects(layer):
+                bb.addPoint(item["start"]["x"], item["start"]["y"])
+                bb.addPoint(item["end"]["x"], item["end"]["y"])
+
+            circles = self.filterCircles(layer)
 
         # Add all circles
-        circles = self.filterCircles(layer)
         for c in circles:
             cx = c["center"]["x"]
             cy = c["center"]["y"]
@@ -927,51 +1496,15 @@ class KicadMod:
 
         polys = self.filterPolys(layer)
         for p in polys:
-            for pt in p["points"]:
-                bb.addPoint(pt["x"], pt["y"])
+            bb.addPoints((pt["x"], pt["y"]) for pt in p["points"])
 
         # Add all arcs
-        arcs = self.filterArcs(layer)
-        for c in arcs:
-            cx = c["start"]["x"]
-            cy = c["start"]["y"]
-            ex = c["end"]["x"]
-            ey = c["end"]["y"]
-
-            dx = ex - cx
-            dy = ey - cy
-
-            r = math.sqrt(dx * dx + dy * dy)
-
-            dalpha = 1
-            alphaend = c["angle"]
-            if math.fabs(alphaend) < 1:
-                dalpha = math.fabs(alphaend) / 5
-            if alphaend < 0:
-                dalpha = -dalpha
-            if math.fabs(alphaend) > 0:
-                a = 0
-                c0 = [ex - cx, ey - cy]
-                # print("c0 = ",c0)
-                while (alphaend > 0 and a <= alphaend) or (
-                    alphaend < 0 and a >= alphaend
-                ):
-                    c1 = [0, 0]
-                    c1[0] = (
-                        math.cos(a / 180 * 3.1415) * c0[0]
-                        - math.sin(a / 180 * 3.1415) * c0[1]
-                    )
-                    c1[1] = (
-                        math.sin(a / 180 * 3.1415) * c0[0]
-                        + math.cos(a / 180 * 3.1415) * c0[1]
-                    )
-
-                    bb.addPoint(cx + c1[0], cy + c1[1])
-                    a = a + dalpha
+        for arc in self.filterArcs(layer):
+            xmin, ymin, xmax, ymax = _arcBounds(arc["start"], arc["mid"], arc["end"])
+            bb.addPoint(xmin, ymin)
+            bb.addPoint(xmax, ymax)
 
-            bb.addPoint(ex, None)
-
-        return bb
+        return bb.xmin, bb.ymin, bb.xmax, bb.ymax
 
     def filterGraphs(self, layer: str):
         return (
@@ -982,13 +1515,18 @@ class KicadMod:
             + self.filterArcs(layer)
         )
 
-    def getPadsByNumber(self, pad_number: Union[str, int]) -> List[Dict[str, Any]]:
-        pads = []
-        for pad in self.pads:
-            if str(pad["number"]).upper() == str(pad_number).upper():
-                pads.append(pad)
+    # Pads grouped by their number (see _padKey)
+    def _padIndex(self) -> Dict[str, List[Dict[str, Any]]]:
+        def build():
+            index = {}
+            for pad in self.pads:
+                index.setdefault(_padKey(pad["number"]), []).append(pad)
+            return index
 
-        return pads
+        return self._cached(("padIndex",), build)
+
+    def getPadsByNumber(self, pad_number: Union[str, int]) -> List[Dict[str, Any]]:
+        return list(self._padIndex().get(_padKey(pad_number), []))
 
     def filterPads(self, pad_type: str) -> List[Dict[str, Any]]:
         pads = []
@@ -1014,14 +1552,25 @@ class KicadMod:
         bb = BoundingBox()
 
         if pads is None:
+            if numpy is not None and self.pads:
+                bb.addPoints(self.padArray()[:, :2])
+                return bb
+
             pads = self.pads
 
-        for pad in pads:
-            pos = pad["pos"]
-            bb.addPoint(pos["x"], pos["y"])
+        bb.addPoints((pad["pos"]["x"], pad["pos"]["y"]) for pad in pads)
 
         return bb
 
+    # Exact outline of a pad in footprint coordinates, as a list of (points, radius)
+    # The pad is the union of these parts, each one is the polygon through its points
+    # (or the line or point for less than three points) grown by its radius. Arcs of
+    # custom pads are only given by their end points and extreme points.
+    def padOutline(
+        self, pad: Dict[str, Any]
+    ) -> List[Tuple[List[Tuple[float, float]], float]]:
+        return self._cached(("padOutline", id(pad)), lambda: _padOutline(pad))
+
     def overpadsBounds(
         self, pads: Optional[List[Dict[str, Any]]] = None
     ) -> BoundingBox:
@@ -1032,64 +1581,8 @@ class KicadMod:
             pads = self.pads
 
         for pad in pads:
-            pos = pad["pos"]
-            px = pos["x"]
-            py = pos["y"]
-
-            # Pad outer dimensions
-            sx = pad["size"]["x"]
-            sy = pad["size"]["y"]
-
-            angle = -pad["pos"]["orientation"]
-
-            # Add each "corner" of the pad (even for oval shapes)
-
-            p1 = _rotatePoint({"x": -sx / 2, "y": -sy / 2}, angle)
-            p2 = _rotatePoint({"x": -sx / 2, "y": +sy / 2}, angle)
-            p3 = _rotatePoint({"x": +sx / 2, "y": +sy / 2}, angle)
-            p4 = _rotatePoint({"x": +sx / 2, "y": -sy / 2}, angle)
-
-            points = [p1, p2, p3, p4]
-
-            # Add more points for custom pad shapes
-            if pad["shape"] == "custom":
-                for p in pad["primitives"]:
-                    if p["type"] == "gr_poly":
-                        # Add polygon points
-                        for point in p["pts"]:
-                            points.append(_rotatePoint(point, angle))
-                    elif p["type"] == "gr_line":
-                        # Add line points
-                        s = _rotatePoint(p["start"], angle)
-                        e = _rotatePoint(p["end"], angle)
-                        w = p["width"]
-                        points.append(_movePoint(s, {"x": -w / 2, "y": -w / 2}))
-                        points.append(_movePoint(s, {"x": -w / 2, "y": +w / 2}))
-                        points.append(_movePoint(s, {"x": +w / 2, "y": +w / 2}))
-                        points.append(_movePoint(s, {"x": +w / 2, "y": -w / 2}))
-                        points.append(_movePoint(e, {"x": -w / 2, "y": -w / 2}))
-                        points.append(_movePoint(e, {"x": -w / 2, "y": +w / 2}))
-                        points.append(_movePoint(e, {"x": +w / 2, "y": +w / 2}))
-                        points.append(_movePoint(e, {"x": +w / 2, "y": -w / 2}))
-                    elif p["type"] == "gr_arc":
-                        # Add arc points
-                        # TODO
-                        pass
-                    elif p["type"] == "gr_circle":
-                        # Add circle points
-                        c = _rotatePoint(p["center"], angle)
-                        e = _rotatePoint(p["end"], angle)
-                        r = math.sqrt((e["x"] - c["x"]) ** 2 + (e["y"] - c["y"]) ** 2)
-                        w = p["width"]
-                        points.append(_movePoint(c, {"x": -r - w / 2, "y": 0}))
-                        points.append(_movePoint(c, {"x": +r + w / 2, "y": 0}))
-                        points.append(_movePoint(c, {"x": 0, "y": -r - w / 2}))
-                        points.append(_movePoint(c, {"x": 0, "y": +r + w / 2}))
-
-            for p in points:
-                x = px + p["x"]
-                y = py + p["y"]
-                bb.addPoint(x, y)
+            for points, r in self.padOutline(pad):
+                bb.addPoints(points, radius=r)
 
         return bb
 
@@ -1339,15 +1832,10 @@ class KicadMod:
 
         se.endGroup(newline=True)
 
-    def save(self, filename: Optional[str] = None):
-        if not filename:
-            filename = self.filename
-
+    # The whole footprint as text, in the file format of SEXPR_BOARD_FILE_VERSION
+    def _serialize(self, tedit: str) -> str:
         se = sexpr.SexprBuilder("footprint")
 
-        # Hex value of current epoch timestamp (in seconds)
-        tedit = hex(int(time.time())).upper()[2:]
-
         self.version = self.SEXPR_BOARD_FILE_VERSION
         self.generator = "KicadMod"
 
@@ -1395,19 +1883,8 @@ class KicadMod:
         se.addOptItem("clearance", self.clearance)
 
         # Set attribute
-        attr = self.attribute.lower()
-        if (
-            attr in ["smd", "through_hole"]
-            or self.exclude_from_bom
-            or self.exclude_from_pos_files
-        ):
-            params = []
-            if attr in ["smd", "through_hole"]:
-                params.append(attr)
-            if self.exclude_from_bom:
-                params.append("exclude_from_bom")
-            if self.exclude_from_pos_files:
-                params.append("exclude_from_pos_files")
+        params = self._attrParams()
+        if params:
             se.addItems({"attr": params})
 
         # Add text items
@@ -1447,6 +1924,290 @@ class KicadMod:
 
         se.endGroup(True)
 
-        with open(filename, "w", newline="\n") as f:
-            f.write(se.output)
-            f.write("\n")
+        return se.output + "\n"
+
+    # The parameters of the attr list, empty if no attr list is needed
+    def _attrParams(self) -> List[str]:
+        params = []
+
+        attr = self.attribute.lower()
+        if attr in ["smd", "through_hole"]:
+            params.append(attr)
+        if self.exclude_from_bom:
+            params.append("exclude_from_bom")
+        if self.exclude_from_pos_files:
+            params.append("exclude_from_pos_files")
+
+        return params
+
+    # The text of a single item, as written by the given _format* method
+    def _itemText(self, formatter, item) -> str:
+        se = sexpr.SexprBuilder(None)
+        se.indent = 1
+        formatter(item, se)
+        return se.output.strip()
+
+    # Apply the changes of the footprint to the text it has been loaded from
+    # Only the changed values are written again, everything else is kept
+    # verbatim, in the format of the file. New items are copies of an item of
+    # the same kind. Returns None if the changes can not be applied this way
+    def _patch(self, original: str) -> Optional[str]:
+        try:
+            orig = KicadMod(data=original)
+            spans = sexpr.top_level_spans(original)
+        except (ValueError, IndexError):
+            return None
+
+        lists = [item for item in orig.sexpr_data if isinstance(item, list)]
+        if not spans or len(lists) != len(spans):
+            return None
+
+        # changes of the first line are not handled
+        if orig.name != self.name or orig.locked != self.locked:
+            return None
+
+        def spansOf(*keys: str) -> List[int]:
+            return [i for i, item in enumerate(lists) if item[0] in keys]
+
+        # same lookup as in _getText()
+        def textSpans(which: str) -> List[int]:
+            return [
+                i
+                for i in spansOf("fp_text") + spansOf("property")
+                if lists[i][1] == which or str(lists[i][1]).lower() == which
+            ]
+
+        def textFormatter(which: str):
+            return lambda text, se: self._formatText(which, text, se)
+
+        # indentation and line endings of the original file
+        first = spans[0][0]
+        indent = original[original.rfind("\n", 0, first) + 1 : first]
+        if indent.strip():
+            indent = "  "
+        newline = "\r\n" if "\r\n" in original else "\n"
+
+        # list of (start, end, text) replacing original[start:end]
+        edits: List[Tuple[int, int, str]] = []
+
+        def insert(pos: int, text: str) -> None:
+            edits.append((pos, pos, newline + indent + text))
+
+        def replace(i: int, text: str) -> None:
+            start, end = spans[i]
+            edits.append((start, end, text.replace("\n", newline)))
+
+        # the text of an item with the values of another one
+        def patched(i: int, orig_item, item, formatter, new_uuid: bool = False):
+            changes = _valueChanges(
+                sexpr.parse_sexp(self._itemText(formatter, orig_item)),
+                sexpr.parse_sexp(self._itemText(formatter, item)),
+            )
+            if changes is None:
+                return None
+            start, end = spans[i]
+            return _patchValues(original[start:end], changes, new_uuid)
+
+        # files up to SEXPR_BOARD_FILE_VERSION are in the format of _serialize()
+        own_format = orig.version <= self.SEXPR_BOARD_FILE_VERSION
+
+        def remove(i: int) -> None:
+            # including the whitespace in front of it
+            start, end = spans[i]
+            edits.append((len(original[:start].rstrip()), end, ""))
+
+        # header values
+        header = spansOf(*self.HEADER_KEYS, "attr")
+        header_end = spans[header[-1]][1] if header else spans[0][0]
+        values = [
+            ("layer", self.layer, orig.layer),
+            ("descr", self.description, orig.description),
+            ("tags", self.tags, orig.tags),
+            ("autoplace_cost90", self.autoplace_cost90, orig.autoplace_cost90),
+            ("autoplace_cost180", self.autoplace_cost180, orig.autoplace_cost180),
+            ("solder_mask_margin", self.solder_mask_margin, orig.solder_mask_margin),
+            ("solder_paste_margin", self.solder_paste_margin, orig.solder_paste_margin),
+            ("solder_paste_ratio", self.solder_paste_ratio, orig.solder_paste_ratio),
+            ("clearance", self.clearance, orig.clearance),
+            ("attr", self._attrParams(), orig._attrParams()),
+        ]
+        for key, value, orig_value in values:
+            if value == orig_value:
+                continue
+
+            ids = spansOf(key)
+            if value in [None, 0, False, []]:
+                for i in ids:
+                    remove(i)
+            elif ids:
+                replace(ids[0], sexpr.SexprItem(value, key))
+            else:
+                insert(header_end, sexpr.SexprItem(value, key))
+
+        # all other items, they are matched by their position in the file
+        items = [
+            (
+                [self.reference],
+                [orig.reference],
+                textSpans("reference")[:1],
+                textFormatter("reference"),
+            ),
+            ([self.value], [orig.value], textSpans("value")[:1], textFormatter("value")),
+            (self.userText, orig.userText, textSpans("user"), textFormatter("user")),
+            (self.lines, orig.lines, spansOf("fp_line"), self._formatLine),
+            (self.rects, orig.rects, spansOf("fp_rect"), self._formatRect),
+            (self.circles, orig.circles, spansOf("fp_circle"), self._formatCircle),
+            (self.polys, orig.polys, spansOf("fp_poly"), self._formatPoly),
+            (self.arcs, orig.arcs, spansOf("fp_arc"), self._formatArc),
+            (self.pads, orig.pads, spansOf("pad"), self._formatPad),
+            (self.models, orig.models, spansOf("model"), self._formatModel),
+        ]
+        for new_items, orig_items, ids, formatter in items:
+            if len(orig_items) != len(ids):
+                return None
+
+            for i, item in enumerate(new_items):
+                text = self._itemText(formatter, item)
+                if i >= len(ids):
+                    # new items are placed after the last item of the same kind
+                    if ids:
+                        text = patched(ids[-1], orig_items[-1], item, formatter, True)
+                    elif not own_format:
+                        text = None
+                    if text is None:
+                        return None
+                    insert(spans[ids[-1] if ids else -1][1], text)
+                elif text != self._itemText(formatter, orig_items[i]):
+                    text = patched(ids[i], orig_items[i], item, formatter)
+                    if text is None:
+                        return None
+                    start, end = spans[ids[i]]
+                    edits.append((start, end, text))
+
+            for i in ids[len(new_items) :]:
+                remove(i)
+
+        # update the timestamp of the last edit, if there is one
+        if edits:
+            for i in spansOf("tedit"):
+                replace(i, sexpr.SexprItem(hex(int(time.time())).upper()[2:], "tedit"))
+
+        output = []
+        pos = 0
+        for start, end, text in sorted(edits, key=lambda e: (e[0], e[1])):
+            output.append(original[pos:start])
+            output.append(text)
+            pos = max(pos, end)
+        output.append(original[pos:])
+
+        return "".join(output)
+
+    # The text the footprint has been loaded from, None if it is not available
+    def _originalText(self) -> Optional[str]:
+        if self._source is not None:
+            return self._source
+
+        if self.filename and os.path.isfile(self.filename):
+            with open(self.filename, newline="") as f:
+                return f.read()
+
+        return None
+
+    def save(self, filename: Optional[str] = None) -> bool:
+        """
+        Save the footprint, the file is only written if its content changes.
+        Items which have not been changed keep their original formatting.
+        Returns True if the file has been written.
+        """
+        if self.sections is not None:
+            raise ValueError("A partially loaded footprint can not be saved")
+
+        # the file is written in mm
+        if self.nanometers:
+            self._convertUnits(nanoMeterToMm)
+            try:
+                return self._save(filename)
+            finally:
+                self._convertUnits(mmToNanoMeter)
+        return self._save(filename)
+
+    def _save(self, filename: Optional[str]) -> bool:
+        if not filename:
+            filename = self.filename
+
+        current = None
+        if os.path.isfile(filename):
+            with open(filename, newline="") as f:
+                current = f.read()
+
+        original = self._originalText()
+        output = self._patch(original) if original is not None else None
+
+        if output is None:
+            # write the whole footprint, with a new timestamp if it has changed
+            output = self._serialize(self.tedit or "0")
+            if output != current:
+                # Hex value of current epoch timestamp (in seconds)
+                output = self._serialize(hex(int(time.time())).upper()[2:])
+
+        if output == current:
+            return False
+
+        with open(filename, "w", newline="") as f:
+            f.write(output)
+
+        return True
+
+
+if __name__ == "__main__":
+    import random
+
+    # compare the analytic arc bounds against a dense sampling of the arc
+    def sampledArcBounds(start, mid, end, steps=20000):
+        cx, cy = _arcCenter(start, mid, end)
+        r = math.hypot(start["x"] - cx, start["y"] - cy)
+
+        # a point of the circle is on the arc, if it is on the same side
+        # of the chord start-end as the mid point
+        def side(x, y):
+            return (end["x"] - start["x"]) * (y - start["y"]) - (
+                end["y"] - start["y"]
+            ) * (x - start["x"])
+
+        mid_side = side(mid["x"], mid["y"])
+        bb = BoundingBox()
+        bb.addPoint(start["x"], start["y"])
+        bb.addPoint(end["x"], end["y"])
+        for i in range(steps):
+            a = 2 * math.pi * i / steps
+            x = cx + r * math.cos(a)
+            y = cy + r * math.sin(a)
+            if side(x, y) * mid_side > 0:
+                bb.addPoint(x, y)
+        return bb.xmin, bb.ymin, bb.xmax, bb.ymax
+
+    random.seed(0)
+    ok = True
+    for n in range(100):
+        cx, cy = random.uniform(-10, 10), random.uniform(-10, 10)
+        r = random.uniform(0.1, 10)
+        a1 = random.uniform(-math.pi, math.pi)
+        a2 = a1 + random.choice([-1, 1]) * random.uniform(0.01, 2 * math.pi - 0.01)
+        if n % 20 == 0:
+            # angles on the cardinal points
+            a1, a2 = 0, random.choice([-1, 1]) * math.pi / 2 * random.randint(1, 3)
+        points = [
+            {"x": cx + r * math.cos(a), "y": cy + r * math.sin(a)}
+            for a in [a1, (a1 + a2) / 2, a2]
+        ]
+        exact = _arcBounds(*points)
+        sampled = sampledArcBounds(*points)
+        # the sampled bounds can only be smaller than the exact bounds
+        tolerance = r * (1 - math.cos(math.pi / 20000)) + 1e-9
+        if any(abs(e - s) > tolerance for e, s in zip(exact, sampled)):
+            print("arc bounds differ:", points, exact, sampled)
+            ok = False
+
+    if not ok:
+        raise ValueError("analytic and sampled arc bounds differ")
+    print("analytic arc bounds match the sampled arc bounds")
@@ -2,13 +2,14 @@
 Library for processing KiCad's symbol files.
 """
 
+import copy
 import json
 import math
 import re
 import sys
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, ClassVar, Dict, Iterable, List, Optional, Tuple
 
 import sexpr
 
@@ -25,8 +26,22 @@ def mil_to_mm(mil: float) -> float:
     return round(mil * 0.0254, 6)
 
 
+# Positions are compared as integer nanometers (the internal unit of KiCad),
+# which avoids rounding the floats over and over again
+def mm_to_nm(mm: float) -> int:
+    return round(mm * 1e6)
+
+
+def nm_to_mm(nm: int) -> float:
+    # whole mm are written without decimals, like KiCad does
+    if isinstance(nm, int) and nm % 1000000 == 0:
+        return nm // 1000000
+    return nm / 1e6
+
+
 def mm_to_mil(mm: float) -> float:
-    return round(mm / 0.0254)
+    # 1 mil = 25400 nm
+    return round(mm_to_nm(mm) / 25400)
 
 
 def _parse_at(i):
@@ -147,16 +162,28 @@ def _has_value(data, lookup) -> bool:
 
 
 class KicadSymbolBase:
+    # the attributes holding lengths, see convert_units()
+    LENGTHS: ClassVar[Tuple[str, ...]] = ()
+
     def as_json(self):
         return json.dumps(self, default=lambda x: x.__dict__, indent=2)
 
     def compare_pos(self, x, y):
         if hasattr(self, "posx") and hasattr(self, "posy"):
-            return round(self.posx, 6) == round(x, 6) and round(self.posy, 6) == round(
-                y, 6
-            )
+            return (mm_to_nm(self.posx), mm_to_nm(self.posy)) == (mm_to_nm(x), mm_to_nm(y))
         return False
 
+    def convert_units(self, convert: Callable[[float], Any]) -> None:
+        """Convert the lengths of the item and its parts, e.g. with mm_to_nm"""
+        for name in self.LENGTHS:
+            value = getattr(self, name)
+            if value is not None:
+                setattr(self, name, convert(value))
+        for value in vars(self).values():
+            for part in value if isinstance(value, list) else [value]:
+                if isinstance(part, KicadSymbolBase):
+                    part.convert_units(convert)
+
     def is_unit(self, unit, demorgan):
         if hasattr(self, "unit") and hasattr(self, "demorgan"):
             return self.unit == unit and self.demorgan == demorgan
@@ -200,6 +227,8 @@ class Color(KicadSymbolBase):
 class TextEffect(KicadSymbolBase):
     """Encode the text effect of an entiry"""
 
+    LENGTHS = ("sizex", "sizey")
+
     sizex: float
     sizey: float
     is_italic: bool = False
@@ -293,6 +322,8 @@ class AltFunction(KicadSymbolBase):
 
 @dataclass
 class Pin(KicadSymbolBase):
+    LENGTHS = ("posx", "posy", "length")
+
     name: str
     number: str
     etype: str
@@ -427,6 +458,8 @@ class Pin(KicadSymbolBase):
 
 @dataclass
 class Circle(KicadSymbolBase):
+    LENGTHS = ("centerx", "centery", "radius", "stroke_width")
+
     centerx: float
     centery: float
     radius: float
@@ -482,6 +515,8 @@ class Arc(KicadSymbolBase):
     #    (stroke (width 0.254) (type default) (color 0 0 0 0))
     #    (fill (type none))
     #  )
+    LENGTHS = ("startx", "starty", "endx", "endy", "midx", "midy", "stroke_width")
+
     startx: float
     starty: float
     endx: float
@@ -539,6 +574,8 @@ class Arc(KicadSymbolBase):
 
 @dataclass
 class Point(KicadSymbolBase):
+    LENGTHS = ("x", "y")
+
     x: float
     y: float
 
@@ -552,6 +589,8 @@ class Point(KicadSymbolBase):
 
 @dataclass
 class Polyline(KicadSymbolBase):
+    LENGTHS = ("stroke_width",)
+
     points: List[Point]
     stroke_width: float = 0.254
     stroke_color: Optional[Color] = None
@@ -647,6 +686,8 @@ class Polyline(KicadSymbolBase):
 
 @dataclass
 class Text(KicadSymbolBase):
+    LENGTHS = ("posx", "posy")
+
     text: str
     posx: float
     posy: float
@@ -681,6 +722,8 @@ class Rectangle(KicadSymbolBase):
     At some point in time we can most likely remove this class since its not used anymore
     """
 
+    LENGTHS = ("startx", "starty", "endx", "endy", "stroke_width")
+
     startx: float
     starty: float
     endx: float
@@ -765,6 +808,8 @@ class Rectangle(KicadSymbolBase):
 
 @dataclass
 class Property(KicadSymbolBase):
+    LENGTHS = ("posx", "posy")
+
     name: str
     value: str
     idd: int
@@ -814,6 +859,8 @@ class Property(KicadSymbolBase):
 
 @dataclass
 class KicadSymbol(KicadSymbolBase):
+    LENGTHS = ("pin_names_offset",)
+
     name: str
     libname: str
     filename: str = field(compare=False)
@@ -922,7 +969,7 @@ class KicadSymbol(KicadSymbolBase):
             for demorgan in demorgan_list:
                 for unit in unit_list:
                     loc = "x{0}_y{1}_u{2}_d{3}".format(
-                        pin.posx, pin.posy, unit, demorgan
+                        mm_to_nm(pin.posx), mm_to_nm(pin.posy), unit, demorgan
                     )
                     if loc in stacks:
                         stacks[loc].append(pin)
@@ -1053,6 +1100,19 @@ class KicadLibrary(KicadSymbolBase):
     symbols: List[KicadSymbol] = field(default_factory=list)
     generator: str = "kicad-library-utils"
     version: str = "20220914"
+    # the lengths are stored as integer nanometers, see from_file()
+    nanometers: bool = False
+
+    # the parts of a symbol that can be loaded on their own, see from_file()
+    SECTIONS = (
+        "properties",
+        "pins",
+        "rectangles",
+        "circles",
+        "arcs",
+        "polylines",
+        "texts",
+    )
 
     def write(self) -> None:
         lib_file = open(self.filename, "w")
@@ -1065,7 +1125,13 @@ class KicadLibrary(KicadSymbolBase):
             ["version", self.version],
             ["generator", self.generator],
         ]
-        for sym in self.symbols:
+        symbols = self.symbols
+        # the file is written in mm
+        if self.nanometers:
+            symbols = copy.deepcopy(symbols)
+            for sym in symbols:
+                sym.convert_units(nm_to_mm)
+        for sym in symbols:
             sx.append(sym.get_sexpr())
         return sexpr.build_sexp(sx)
 
@@ -1089,13 +1155,35 @@ class KicadLibrary(KicadSymbolBase):
             already_seen.add(symbol.name)
 
     @classmethod
-    def from_file(cls, filename: str, data=None) -> "KicadLibrary":
+    def from_file(
+        cls,
+        filename: str,
+        data=None,
+        sections: Optional[Iterable[str]] = None,
+        nanometers: bool = False,
+    ) -> "KicadLibrary":
         """
         Parse a symbol library from a file.
 
+        If sections is given, only those parts of the symbols (see SECTIONS) are
+        decoded, the others are left empty. The name, flags, extends and the unit
+        counts are always loaded. Such a library must not be written back.
+
+        If nanometers is set, all positions and sizes are stored as integer
+        nanometers (the internal unit of KiCad) instead of mm, so they can be
+        compared and hashed exactly. get_sexpr() converts them back to mm. The
+        KLC rules expect mm, check_symbol does not use this mode.
+
         raises KicadFileFormatError in case of problems
         """
-        library = KicadLibrary(filename)
+        if sections is None:
+            sections = cls.SECTIONS
+        sections = set(sections)
+        unknown = sections - set(cls.SECTIONS)
+        if unknown:
+            raise ValueError("Unknown sections: " + ", ".join(sorted(unknown)))
+
+        library = KicadLibrary(filename, nanometers=nanometers)
 
         # read the s-expression data
         try:
@@ -1141,14 +1229,15 @@ class KicadLibrary(KicadSymbolBase):
                 symbol.extends = extends[0][1]
 
             # extract properties
-            for prop in _get_array(item, "property"):
-                try:
-                    # TODO: do not append the new property, if it is None
-                    symbol.properties.append(Property.from_sexpr(prop))
-                except ValueError as exc:
-                    raise KicadFileFormatError(
-                        f"Failed to import '{partname}': {exc}"
-                    ) from exc
+            if "properties" in sections:
+                for prop in _get_array(item, "property"):
+                    try:
+                        # TODO: do not append the new property, if it is None
+                        symbol.properties.append(Property.from_sexpr(prop))
+                    except ValueError as exc:
+                        raise KicadFileFormatError(
+                            f"Failed to import '{partname}': {exc}"
+                        ) from exc
 
             # get flags
             symbol.in_bom = _get_value_of(item, "in_bom", "no") == "yes"
@@ -1199,33 +1288,46 @@ class KicadLibrary(KicadSymbolBase):
                 symbol.unit_count = max(unit_idx, symbol.unit_count)
                 symbol.demorgan_count = max(demorgan_idx, symbol.demorgan_count)
 
-                # extract pins and graphical items
-                for pin in _get_array(unit_data, "pin"):
-                    try:
-                        symbol.pins.append(Pin.from_sexpr(pin, unit_idx, demorgan_idx))
-                    except ValueError as valexc:
-                        raise KicadFileFormatError(
-                            f"Failed to parse symbol {partname}: {valexc}"
-                        ) from None
-                for circle in _get_array(unit_data, "circle"):
-                    symbol.circles.append(
-                        Circle.from_sexpr(circle, unit_idx, demorgan_idx)
-                    )
-                for arc in _get_array(unit_data, "arc"):
-                    symbol.arcs.append(Arc.from_sexpr(arc, unit_idx, demorgan_idx))
-                for rect in _get_array(unit_data, "rectangle"):
-                    # symbol.polylines.append(
-                    #     Rectangle.from_sexpr(rect, unit, demorgan).as_polyline()
-                    # )
-                    symbol.rectangles.append(
-                        Rectangle.from_sexpr(rect, unit_idx, demorgan_idx)
-                    )
-                for poly in _get_array(unit_data, "polyline"):
-                    symbol.polylines.append(
-                        Polyline.from_sexpr(poly, unit_idx, demorgan_idx)
-                    )
-                for text in _get_array(unit_data, "text"):
-                    symbol.texts.append(Text.from_sexpr(text, unit_idx, demorgan_idx))
+                # extract pins and graphical items, skip the ones not asked for
+                if "pins" in sections:
+                    for pin in _get_array(unit_data, "pin"):
+                        try:
+                            symbol.pins.append(
+                                Pin.from_sexpr(pin, unit_idx, demorgan_idx)
+                            )
+                        except ValueError as valexc:
+                            raise KicadFileFormatError(
+                                f"Failed to parse symbol {partname}: {valexc}"
+                            ) from None
+                if "circles" in sections:
+                    for circle in _get_array(unit_data, "circle"):
+                        symbol.circles.append(
+                            Circle.from_sexpr(circle, unit_idx, demorgan_idx)
+                        )
+                if "arcs" in sections:
+                    for arc in _get_array(unit_data, "arc"):
+                        symbol.arcs.append(Arc.from_sexpr(arc, unit_idx, demorgan_idx))
+                if "rectangles" in sections:
+                    for rect in _get_array(unit_data, "rectangle"):
+                        # symbol.polylines.append(
+                        #     Rectangle.from_sexpr(rect, unit, demorgan).as_polyline()
+                        # )
+                        symbol.rectangles.append(
+                            Rectangle.from_sexpr(rect, unit_idx, demorgan_idx)
+                        )
+                if "polylines" in sections:
+                    for poly in _get_array(unit_data, "polyline"):
+                        symbol.polylines.append(
+                            Polyline.from_sexpr(poly, unit_idx, demorgan_idx)
+                        )
+                if "texts" in sections:
+                    for text in _get_array(unit_data, "text"):
+                        symbol.texts.append(
+                            Text.from_sexpr(text, unit_idx, demorgan_idx)
+                        )
+
+            if nanometers:
+                symbol.convert_units(mm_to_nm)
 
             # add it to the list of symbols
             library.symbols.append(symbol)
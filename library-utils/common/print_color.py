@@ -1,7 +1,7 @@
 import platform
 import sys
 from time import time
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, TextIO
 
 
 class PrintColor:
@@ -16,6 +16,7 @@ class PrintColor:
         max_width: int = 0,
         indentation: int = 0,
         buffered: bool = False,
+        file: Optional[TextIO] = None,
     ):
         self._color: Dict[str, str] = {
             "regular": "\033[0m",
@@ -43,6 +44,8 @@ class PrintColor:
         self._indentation: int = indentation
         self.buffer: List[str] = []
         self.buffered: bool = buffered
+        # where the lines are printed to, None is stdout
+        self.file: Optional[TextIO] = file
 
         # TODO: why is the usage of "colorama" limited to Windows?
         if platform.system() == "Windows":
@@ -58,11 +61,36 @@ class PrintColor:
             else:
                 colorama.init()
 
+        # the escape sequences around every line, empty without colors
+        self._prefix: Dict[str, str] = {
+            name: code if self._use_color else ""
+            for name, code in self._color.items()
+        }
+        self._suffix: str = self._color["regular"] if self._use_color else ""
+
+    # Write the buffered lines at once
     def flush(self) -> None:
-        for line in self.buffer:
-            print(line)
+        if not self.buffer:
+            return
+
+        out = self.file if self.file is not None else sys.stdout
+        try:
+            out.write("\n".join(self.buffer) + "\n")
+        except (IOError, ValueError):
+            print("ERROR printing output", file=self.file)
         self.buffer.clear()
 
+    def _write(self, line: str) -> None:
+        if self.buffered:
+            self.buffer.append(line)
+            return
+
+        out = self.file if self.file is not None else sys.stdout
+        try:
+            out.write(line + "\n")
+        except (IOError, ValueError):
+            print("ERROR printing output", file=self.file)
+
     def _replace_tabs(self, text: str) -> str:
         if self._tab_size == 0:
             return text
@@ -83,6 +111,11 @@ class PrintColor:
         if not indentation:
             indentation = self._indentation
 
+        # nothing to wrap or color, the most common case
+        if max_width <= 0 and not self._use_color:
+            self._write(self._replace_tabs(" " * indentation + text))
+            return
+
         # break the text in lines with max_width
         if max_width > 0:
             s = 0
@@ -106,30 +139,11 @@ class PrintColor:
         else:
             lines = [text]
 
-        # print lines
+        # print lines with indentation, spaces instead of tabs and the color
+        prefix = self._prefix[color_name]
         for line in lines:
-            # insert indentation
-            line = " " * indentation + line
-
-            # replace tabs by space
-            line = self._replace_tabs(line)
-
-            # apply color
-            if self._use_color:
-                # get the color according to function name
-                color = self._color[color_name]
-                # restore the regular color
-                regular = self._color["regular"]
-                # construct the final line
-                line = color + line + regular
-
-            if self.buffered:
-                self.buffer.append(line)
-            else:
-                try:
-                    print(line)
-                except (IOError, ValueError):
-                    print("ERROR printing output")
+            line = self._replace_tabs(" " * indentation + line)
+            self._write(prefix + line + self._suffix)
 
     def regular(
         self,
@@ -137,7 +151,7 @@ class PrintColor:
         max_width: Optional[int] = None,
         indentation: Optional[int] = None,
     ):
-        self._do_print(sys._getframe().f_code.co_name, text, max_width, indentation)
+        self._do_print("regular", text, max_width, indentation)
 
     def black(
         self,
@@ -145,7 +159,7 @@ class PrintColor:
         max_width: Optional[int] = None,
         indentation: Optional[int] = None,
     ):
-        self._do_print(sys._getframe().f_code.co_name, text, max_width, indentation)
+        self._do_print("black", text, max_width, indentation)
 
     def red(
         self,
@@ -153,7 +167,7 @@ class PrintColor:
         max_width: Optional[int] = None,
         indentation: Optional[int] = None,
     ):
-        self._do_print(sys._getframe().f_code.co_name, text, max_width, indentation)
+        self._do_print("red", text, max_width, indentation)
 
     def green(
         self,
@@ -161,7 +175,7 @@ class PrintColor:
         max_width: Optional[int] = None,
         indentation: Optional[int] = None,
     ):
-        self._do_print(sys._getframe().f_code.co_name, text, max_width, indentation)
+        self._do_print("green", text, max_width, indentation)
 
     def brown(
         self,
@@ -169,7 +183,7 @@ class PrintColor:
         max_width: Optional[int] = None,
         indentation: Optional[int] = None,
     ):
-        self._do_print(sys._getframe().f_code.co_name, text, max_width, indentation)
+        self._do_print("brown", text, max_width, indentation)
 
     def blue(
         self,
@@ -177,7 +191,7 @@ class PrintColor:
         max_width: Optional[int] = None,
         indentation: Optional[int] = None,
     ):
-        self._do_print(sys._getframe().f_code.co_name, text, max_width, indentation)
+        self._do_print("blue", text, max_width, indentation)
 
     def purple(
         self,
@@ -185,7 +199,7 @@ class PrintColor:
         max_width: Optional[int] = None,
         indentation: Optional[int] = None,
     ):
-        self._do_print(sys._getframe().f_code.co_name, text, max_width, indentation)
+        self._do_print("purple", text, max_width, indentation)
 
     def cyan(
         self,
@@ -193,7 +207,7 @@ class PrintColor:
         max_width: Optional[int] = None,
         indentation: Optional[int] = None,
     ):
-        self._do_print(sys._getframe().f_code.co_name, text, max_width, indentation)
+        self._do_print("cyan", text, max_width, indentation)
 
     def gray(
         self,
@@ -201,7 +215,7 @@ class PrintColor:
         max_width: Optional[int] = None,
         indentation: Optional[int] = None,
     ):
-        self._do_print(sys._getframe().f_code.co_name, text, max_width, indentation)
+        self._do_print("gray", text, max_width, indentation)
 
     def dark_gray(
         self,
@@ -209,7 +223,7 @@ class PrintColor:
         max_width: Optional[int] = None,
         indentation: Optional[int] = None,
     ):
-        self._do_print(sys._getframe().f_code.co_name, text, max_width, indentation)
+        self._do_print("dark_gray", text, max_width, indentation)
 
     def light_red(
         self,
@@ -217,7 +231,7 @@ class PrintColor:
         max_width: Optional[int] = None,
         indentation: Optional[int] = None,
     ):
-        self._do_print(sys._getframe().f_code.co_name, text, max_width, indentation)
+        self._do_print("light_red", text, max_width, indentation)
 
     def light_green(
         self,
@@ -225,7 +239,7 @@ class PrintColor:
         max_width: Optional[int] = None,
         indentation: Optional[int] = None,
     ):
-        self._do_print(sys._getframe().f_code.co_name, text, max_width, indentation)
+        self._do_print("light_green", text, max_width, indentation)
 
     def yellow(
         self,
@@ -233,7 +247,7 @@ class PrintColor:
         max_width: Optional[int] = None,
         indentation: Optional[int] = None,
     ):
-        self._do_print(sys._getframe().f_code.co_name, text, max_width, indentation)
+        self._do_print("yellow", text, max_width, indentation)
 
     def light_blue(
         self,
@@ -241,7 +255,7 @@ class PrintColor:
         max_width: Optional[int] = None,
         indentation: Optional[int] = None,
     ):
-        self._do_print(sys._getframe().f_code.co_name, text, max_width, indentation)
+        self._do_print("light_blue", text, max_width, indentation)
 
     def light_purple(
         self,
@@ -249,7 +263,7 @@ class PrintColor:
         max_width: Optional[int] = None,
         indentation: Optional[int] = None,
     ):
-        self._do_print(sys._getframe().f_code.co_name, text, max_width, indentation)
+        self._do_print("light_purple", text, max_width, indentation)
 
     def light_cyan(
         self,
@@ -257,7 +271,7 @@ class PrintColor:
         max_width: Optional[int] = None,
         indentation: Optional[int] = None,
     ):
-        self._do_print(sys._getframe().f_code.co_name, text, max_width, indentation)
+        self._do_print("light_cyan", text, max_width, indentation)
 
     def white(
         self,
@@ -265,7 +279,7 @@ class PrintColor:
         max_width: Optional[int] = None,
         indentation: Optional[int] = None,
     ):
-        self._do_print(sys._getframe().f_code.co_name, text, max_width, indentation)
+        self._do_print("white", text, max_width, indentation)
 
     def start_fold_section(
         self,
@@ -1,51 +1,354 @@
 import inspect
 import json
+import math
 import os
+import stat
+import tempfile
+import time
+from collections.abc import Mapping
 from enum import Enum
-from typing import List, Tuple
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    Optional,
+    TextIO,
+    Tuple,
+    Union,
+)
 
 from print_color import PrintColor
 
 
-def logError(
-    log_file: str, rule_name: str, lib_name: str, item_name: str, warning: bool = False
-) -> None:
+# Write to a temporary file and replace the target, so that it is never left
+# half written
+def _writeAtomic(filename: str, text: str) -> None:
+    # mkstemp() creates the file only readable by its owner, it gets the mode
+    # of the file it replaces or the one open() would have given it instead
+    try:
+        mode = stat.S_IMODE(os.stat(filename).st_mode)
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        mode = 0o666 & ~umask
+
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, tmp_name = tempfile.mkstemp(suffix=".json", dir=directory)
+    try:
+        with os.fdopen(fd, "w") as json_file:
+            json_file.write(text)
+        os.chmod(tmp_name, mode)
+        os.replace(tmp_name, filename)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+
+
+def _mergeLogData(target: Dict[str, Any], data: Dict[str, Any]) -> None:
+    for key, rules in data.items():
+        for rule_name, entries in rules.items():
+            target.setdefault(key, {}).setdefault(rule_name, []).extend(entries)
+
+
+class ErrorLog:
     """
-    Log KLC error output to a json file.
+    Collects KLC error output in memory and writes it to a json file at once.
     The JSON file will contain a cumulative dict
     of the errors and the library items that do not comply.
     """
 
-    if not log_file.endswith(".json"):
-        log_file += ".json"
+    def __init__(self, log_file: str):
+        if not log_file.endswith(".json"):
+            log_file += ".json"
 
-    if os.path.exists(log_file) and os.path.isfile(log_file):
-        with open(log_file, "r") as json_file:
-            try:
-                log_data = json.load(json_file)
-            except ValueError:
-                print("Found bad JSON data - clearing")
-                log_data = {}
+        self.log_file: str = log_file
+        self.data: Dict[str, Dict[str, List[Dict[str, str]]]] = {}
 
-    else:
-        log_data = {}
+    def add(
+        self, rule_name: str, lib_name: str, item_name: str, warning: bool = False
+    ) -> None:
+        key = "warnings" if warning else "errors"
+        log_entry = {"library": lib_name, "item": item_name}
+        self.data.setdefault(key, {}).setdefault(rule_name, []).append(log_entry)
 
-    key = "warnings" if warning else "errors"
+    # Add the entries collected by another ErrorLog (e.g. its data from a worker)
+    def merge(self, data: Dict[str, Dict[str, List[Dict[str, str]]]]) -> None:
+        _mergeLogData(self.data, data)
 
-    if key not in log_data:
-        log_data[key] = {}
+    def _load(self) -> Dict[str, Any]:
+        if os.path.exists(self.log_file) and os.path.isfile(self.log_file):
+            with open(self.log_file, "r") as json_file:
+                try:
+                    return json.load(json_file)
+                except ValueError:
+                    print("Found bad JSON data - clearing")
 
-    log_entry = {"library": lib_name, "item": item_name}
+        return {}
 
-    if rule_name not in log_data[key]:
-        log_data[key][rule_name] = []
+    def save(self) -> None:
+        if not self.data:
+            return
 
-    log_data[key][rule_name].append(log_entry)
+        # append the collected entries to the ones already in the file
+        log_data = self._load()
+        _mergeLogData(log_data, self.data)
 
-    # Write the log data back to file
-    with open(log_file, "w") as json_file:
         op = json.dumps(log_data, indent=4, sort_keys=True, separators=(",", ":"))
-        json_file.write(op)
+        _writeAtomic(self.log_file, op)
+
+
+def logError(
+    log_file: str, rule_name: str, lib_name: str, item_name: str, warning: bool = False
+) -> None:
+    """
+    Log a single KLC error to a json file.
+    Rewrites the whole file, use an ErrorLog to log many errors.
+    """
+
+    log = ErrorLog(log_file)
+    log.add(rule_name, lib_name, item_name, warning)
+    log.save()
+
+
+class RuleTimings:
+    """
+    Collects the run time of the rules per component (in nanoseconds),
+    used by the --profile option of the checkers.
+    """
+
+    def __init__(self):
+        # rule name -> phase (check, fix, ...) -> component -> time in ns
+        self.data: Dict[str, Dict[str, Dict[str, int]]] = {}
+
+    def add(self, rule_name: str, phase: str, component: str, ns: int) -> None:
+        entries = self.data.setdefault(rule_name, {}).setdefault(phase, {})
+        entries[component] = entries.get(component, 0) + ns
+
+    # Call func and record its run time, returns the result of func
+    def measure(self, rule_name: str, phase: str, component: str, func: Callable):
+        start = time.perf_counter_ns()
+        try:
+            return func()
+        finally:
+            self.add(rule_name, phase, component, time.perf_counter_ns() - start)
+
+    # Add the timings collected by another RuleTimings (e.g. its data from a worker)
+    def merge(self, data: Dict[str, Dict[str, Dict[str, int]]]) -> None:
+        for rule_name, phases in data.items():
+            for phase, entries in phases.items():
+                for component, ns in entries.items():
+                    self.add(rule_name, phase, component, ns)
+
+    # Statistics per rule and phase, the slowest first
+    def rules(self) -> List[Dict[str, Any]]:
+        rows = []
+        for rule_name, phases in self.data.items():
+            for phase, entries in phases.items():
+                times = sorted(entries.values())
+                # nearest-rank percentile
+                p95 = times[max(math.ceil(0.95 * len(times)) - 1, 0)]
+                rows.append(
+                    {
+                        "rule": rule_name,
+                        "phase": phase,
+                        "count": len(times),
+                        "total_ns": sum(times),
+                        "mean_ns": sum(times) // len(times),
+                        "p95_ns": p95,
+                    }
+                )
+
+        return sorted(rows, key=lambda row: row["total_ns"], reverse=True)
+
+    # Total time per component and the rule taking most of it, the slowest first
+    def components(self) -> List[Dict[str, Any]]:
+        totals: Dict[str, int] = {}
+        slowest: Dict[str, Tuple[int, str]] = {}
+        for rule_name, phases in self.data.items():
+            for phase, entries in phases.items():
+                for component, ns in entries.items():
+                    totals[component] = totals.get(component, 0) + ns
+                    if ns > slowest.get(component, (-1, ""))[0]:
+                        slowest[component] = (ns, rule_name)
+
+        rows = [
+            {
+                "component": component,
+                "total_ns": total,
+                "slowest_rule": slowest[component][1],
+                "slowest_rule_ns": slowest[component][0],
+            }
+            for component, total in totals.items()
+        ]
+        return sorted(rows, key=lambda row: row["total_ns"], reverse=True)
+
+    def report(self, printer: PrintColor, count: int = 10) -> None:
+        def ms(ns: int) -> str:
+            return "{:.3f}".format(ns / 1e6)
+
+        printer.white("Rule timings:")
+        printer.regular(
+            "{:<8} {:<8} {:>7} {:>12} {:>10} {:>10}".format(
+                "Rule", "Phase", "Count", "Total [ms]", "Mean [ms]", "P95 [ms]"
+            ),
+            indentation=2,
+        )
+        for row in self.rules():
+            printer.regular(
+                "{:<8} {:<8} {:>7} {:>12} {:>10} {:>10}".format(
+                    row["rule"],
+                    row["phase"],
+                    row["count"],
+                    ms(row["total_ns"]),
+                    ms(row["mean_ns"]),
+                    ms(row["p95_ns"]),
+                ),
+                indentation=2,
+            )
+
+        printer.white("Slowest components:")
+        for row in self.components()[:count]:
+            printer.regular(
+                "{:>10} ms  {} (mostly {}: {} ms)".format(
+                    ms(row["total_ns"]),
+                    row["component"],
+                    row["slowest_rule"],
+                    ms(row["slowest_rule_ns"]),
+                ),
+                indentation=2,
+            )
+
+    def save(self, filename: str) -> None:
+        data = {
+            "rules": self.rules(),
+            "components": self.components(),
+            "timings": self.data,
+        }
+        with open(filename, "w") as json_file:
+            json_file.write(json.dumps(data, indent=4, sort_keys=True))
+
+
+class CostModel:
+    """
+    The cost (run time in ns) of checking the components, as recorded by
+    previous runs. The checkers use it to start the most expensive work first.
+    The file has the "components" of RuleTimings.save(), so the output of
+    --profile-json can be used as well.
+    """
+
+    def __init__(self, filename: Optional[str] = None):
+        self.filename: Optional[str] = filename
+        # component ("library:name") -> time in ns
+        self.costs: Dict[str, int] = {}
+        # the components measured in this run, see record()
+        self.measured: Dict[str, int] = {}
+        # anything else in the file (e.g. the rule timings) is kept as it is
+        self.data: Dict[str, Any] = {}
+        if filename and os.path.isfile(filename):
+            self._load()
+
+        # the total per library, for items which are whole libraries
+        self.libraries: Dict[str, int] = {}
+        for component, ns in self.costs.items():
+            library = component.split(":")[0]
+            self.libraries[library] = self.libraries.get(library, 0) + ns
+
+    def _load(self) -> None:
+        with open(self.filename, "r") as json_file:
+            try:
+                data = json.load(json_file)
+            except ValueError:
+                print("Found bad JSON data - ignoring the recorded costs")
+                return
+
+        self.data = data
+        for row in data.get("components", []):
+            self.costs[row["component"]] = row["total_ns"]
+
+    def record(self, component: str, ns: int) -> None:
+        self.measured[component] = self.measured.get(component, 0) + ns
+
+    # The recorded cost of a component, or of a whole library if the name has
+    # no ":", None if it is unknown
+    def recorded(self, name: str) -> Optional[int]:
+        if ":" in name:
+            return self.costs.get(name)
+        return self.libraries.get(name)
+
+    # The cost of every item (name, heuristic cost, kind of heuristic, e.g.
+    # "size" for file sizes). Items without a recorded cost get their heuristic
+    # cost, scaled by the time per heuristic unit of the items of the same kind
+    # which have one (of all items, if there are none of that kind).
+    def estimate(self, items: List[Tuple[str, float, str]]) -> List[float]:
+        recorded = [self.recorded(name) for name, heuristic, kind in items]
+        # kind -> [time in ns, heuristic units] of the items with a recorded cost
+        known: Dict[str, List[float]] = {}
+        total = [0.0, 0.0]
+        for (name, heuristic, kind), ns in zip(items, recorded):
+            if ns is not None:
+                sums = known.setdefault(kind, [0.0, 0.0])
+                sums[0] += ns
+                sums[1] += heuristic
+                total[0] += ns
+                total[1] += heuristic
+        scale = total[0] / total[1] if total[1] > 0 else 1.0
+        scales = {
+            kind: ns / units if units > 0 else scale
+            for kind, (ns, units) in known.items()
+        }
+
+        return [
+            float(ns) if ns is not None else heuristic * scales.get(kind, scale)
+            for (name, heuristic, kind), ns in zip(items, recorded)
+        ]
+
+    # Write the recorded costs, updated with the ones measured in this run
+    def save(self) -> None:
+        if not self.filename or not self.measured:
+            return
+
+        costs = dict(self.costs)
+        costs.update(self.measured)
+        rows = [
+            {"component": component, "total_ns": ns}
+            for component, ns in sorted(
+                costs.items(), key=lambda item: item[1], reverse=True
+            )
+        ]
+        data = dict(self.data)
+        data["components"] = rows
+        _writeAtomic(self.filename, json.dumps(data, indent=4))
+
+
+# Group work items into chunks for the workers, the most expensive items first.
+# The chunks get smaller towards the end (guided self-scheduling), so workers
+# which are done early pick up the small chunks left instead of idling while
+# one of them works through a large share. To limit the overhead, there are
+# at most about 8 chunks per worker. Returns lists of item indices.
+def scheduleChunks(costs: List[float], workers: int) -> List[List[int]]:
+    order = sorted(range(len(costs)), key=lambda i: costs[i], reverse=True)
+    workers = max(workers, 1)
+    remaining = float(sum(costs))
+    smallest = remaining / (8 * workers)
+
+    chunks: List[List[int]] = []
+    chunk: List[int] = []
+    chunk_cost = 0.0
+    for i in order:
+        chunk.append(i)
+        chunk_cost += costs[i]
+        if chunk_cost >= max(remaining / (2 * workers), smallest):
+            chunks.append(chunk)
+            remaining -= chunk_cost
+            chunk = []
+            chunk_cost = 0.0
+
+    if chunk:
+        chunks.append(chunk)
+    return chunks
 
 
 # Static functions
@@ -94,6 +397,75 @@ def checkLineEndings(filename: str):
     return True
 
 
+# The union of the sections needed by the given rules, None if one needs everything
+def requiredSections(rules: Iterable["KLCRuleBase"]) -> Optional[FrozenSet[str]]:
+    sections: FrozenSet[str] = frozenset()
+    for rule in rules:
+        if rule.sections is None:
+            return None
+        sections |= rule.sections
+    return sections
+
+
+class DeferredMessage:
+    """
+    A message that is only built when it is printed, either a str.format()
+    template or a callable returning the message, with their arguments.
+    It can also be used as an argument of another message.
+    """
+
+    __slots__ = ("message", "args", "kwargs")
+
+    def __init__(self, message: "MessageSource", *args, **kwargs):
+        self.message = message
+        self.args = args
+        self.kwargs = kwargs
+
+    def __str__(self) -> str:
+        if callable(self.message):
+            return str(self.message(*self.args, **self.kwargs))
+
+        return self.message.format(*self.args, **self.kwargs)
+
+    def __format__(self, format_spec: str) -> str:
+        return format(str(self), format_spec)
+
+
+class BuiltMessage(str):
+    """
+    A message that is built right away, e.g. before a fix changes the items it
+    is about. It keeps the position of its item for the result sinks.
+    """
+
+    position: Optional[Dict[str, float]]
+
+    def __new__(cls, message: "Message") -> "BuiltMessage":
+        built = super().__new__(cls, str(message))
+        built.position = messagePosition(message)
+        return built
+
+
+# Messages of the rules, plain strings or DeferredMessages
+Message = Union[str, DeferredMessage]
+
+# What the rules pass as message, a string, template or callable
+MessageSource = Union[str, Callable[..., str]]
+
+
+def _message(msg: Union[MessageSource, DeferredMessage], args, kwargs) -> Message:
+    if isinstance(msg, (str, DeferredMessage)) and not args and not kwargs:
+        return msg
+
+    return DeferredMessage(msg, *args, **kwargs)
+
+
+def _prefixed(prefix: str, msg: Message) -> Message:
+    if isinstance(msg, str):
+        return prefix + msg
+
+    return DeferredMessage(prefix + "{0}", msg)
+
+
 class Verbosity(Enum):
     NONE = 0
     NORMAL = 1
@@ -114,30 +486,70 @@ class KLCRuleBase:
 
     verbosity: Verbosity = Verbosity.NONE
 
-    @property
-    def name(self) -> str:
-        path = inspect.getfile(self.__class__)
+    # build the messages when they are added instead of when they are printed,
+    # needed if a fix changes the items before the messages are printed
+    eagerMessages: bool = False
+
+    # identity of the rule, set once per rule class by register()
+    _name: str = ""
+    _url: str = ""
+    _description: str = ""
+
+    # the data sections of the checked item the rule reads (see the loaders)
+    # None means the rule needs everything
+    sections: Optional[FrozenSet[str]] = None
+
+    # Compute the name, url and description of the rule class
+    # The name is taken from the file of the rule, e.g. S3_1.py is rule S3.1
+    @classmethod
+    def register(cls) -> None:
+        path = inspect.getfile(cls)
         path = os.path.basename(path)
         path = "".join(path.split(".")[:-1])
-        return path.replace("_", ".")
+        name = path.replace("_", ".")
+
+        if name.startswith("EC"):
+            url = "(extended check)"
+        else:
+            categories = {
+                "F": "footprint",
+                "G": "general",
+                "M": "model",
+                "S": "symbol",
+            }
+
+            category = categories[name[0]]
+            group = name.lower().split(".")[0]
+            url = f"https://klc.kicad.org/{category}/{group}/{name.lower()}/"
+
+        cls._name = name
+        cls._url = url
+        cls._description = cls.__doc__.strip().splitlines()[0].strip()
+
+    @property
+    def name(self) -> str:
+        return self._name
 
     @property
     def url(self) -> str:
-        if self.name.startswith("EC"):
-            return "(extended check)"
+        return self._url
 
-        categories = {"F": "footprint", "G": "general", "M": "model", "S": "symbol"}
+    def __init__(self):
+        # rules are normally registered by get_all_symbol_rules/get_all_footprint_rules
+        if "_name" not in self.__class__.__dict__:
+            self.__class__.register()
 
-        category = categories[self.name[0]]
-        name = self.name.lower()
-        group = name.split(".")[0]
-        url = f"https://klc.kicad.org/{category}/{group}/{name}/"
+        self.description = self._description
+        self.messageBuffer: List[Tuple[Message, Verbosity, Severity]] = []
 
-        return url
+        self.resetErrorCount()
+        self.resetWarningCount()
 
-    def __init__(self):
-        self.description = self.__doc__.strip().splitlines()[0].strip()
-        self.messageBuffer: List[Tuple[str, Verbosity, Severity]] = []
+    # Prepare the rule for checking another component
+    # Rules with state of their own extend this to reset it, so that one
+    # instance of every rule can be used for all components
+    def reset(self, component) -> None:
+        self.messageBuffer = []
 
         self.resetErrorCount()
         self.resetWarningCount()
@@ -164,28 +576,39 @@ class KLCRuleBase:
 
     # adds message into buffer only if such level of verbosity is wanted
     def verboseOut(
-        self, msgVerbosity: Verbosity, severity: Severity, message: str
+        self, msgVerbosity: Verbosity, severity: Severity, message: Message
     ) -> None:
+        if self.eagerMessages:
+            message = BuiltMessage(message)
         self.messageBuffer.append((message, msgVerbosity, severity))
 
-    def warning(self, msg: str) -> None:
+    # The messages are either plain strings, or str.format() templates or
+    # callables with their arguments. The latter are only built when they are
+    # printed, e.g. self.errorExtra(pinString, pin) costs nothing in a silent run
+    def warning(self, msg: MessageSource, *args, **kwargs) -> None:
         self.warning_count += 1
+        msg = _message(msg, args, kwargs)
         self.verboseOut(Verbosity.NORMAL, Severity.WARNING, msg)
 
-    def warningExtra(self, msg: str) -> None:
-        self.verboseOut(Verbosity.HIGH, Severity.WARNING, " - " + msg)
+    def warningExtra(self, msg: MessageSource, *args, **kwargs) -> None:
+        msg = _prefixed(" - ", _message(msg, args, kwargs))
+        self.verboseOut(Verbosity.HIGH, Severity.WARNING, msg)
 
-    def error(self, msg: str) -> None:
+    def error(self, msg: MessageSource, *args, **kwargs) -> None:
         self.error_count += 1
+        msg = _message(msg, args, kwargs)
         self.verboseOut(Verbosity.NORMAL, Severity.ERROR, msg)
 
-    def errorExtra(self, msg: str) -> None:
-        self.verboseOut(Verbosity.HIGH, Severity.ERROR, " - " + msg)
+    def errorExtra(self, msg: MessageSource, *args, **kwargs) -> None:
+        msg = _prefixed(" - ", _message(msg, args, kwargs))
+        self.verboseOut(Verbosity.HIGH, Severity.ERROR, msg)
 
-    def info(self, msg: str) -> None:
-        self.verboseOut(Verbosity.NONE, Severity.INFO, "> " + msg)
+    def info(self, msg: MessageSource, *args, **kwargs) -> None:
+        msg = _prefixed("> ", _message(msg, args, kwargs))
+        self.verboseOut(Verbosity.NONE, Severity.INFO, msg)
 
-    def success(self, msg: str) -> None:
+    def success(self, msg: MessageSource, *args, **kwargs) -> None:
+        msg = _message(msg, args, kwargs)
         self.verboseOut(Verbosity.NORMAL, Severity.SUCCESS, msg)
 
     def check(self, component) -> None:
@@ -226,9 +649,10 @@ class KLCRuleBase:
         for message in self.messageBuffer:
             v = message[1]  # Verbosity
             s = message[2]  # Severity
-            msg = message[0]
 
             if v.value <= verbosity.value:
+                # deferred messages are only built here
+                msg = str(message[0])
                 if s == Severity.INFO:
                     printer.gray(msg, indentation=4)
                 elif s == Severity.WARNING:
@@ -243,3 +667,199 @@ class KLCRuleBase:
         # Clear message buffer
         self.messageBuffer = []
         return True
+
+    # The messages as structured records for a ResultSink, one record per
+    # error or warning, the *Extra messages that follow it are its details
+    def violations(
+        self, library: str, item: str, filename: str, warnings: bool = True
+    ) -> List[Dict[str, Any]]:
+        records: List[Dict[str, Any]] = []
+        record: Optional[Dict[str, Any]] = None
+        for message, v, s in self.messageBuffer:
+            if s not in (Severity.ERROR, Severity.WARNING):
+                continue
+
+            if v.value > Verbosity.NORMAL.value:
+                if record is not None:
+                    detail = str(message)
+                    if detail.startswith(" - "):
+                        detail = detail[3:]
+                    position = messagePosition(message)
+                    record["details"].append({"message": detail, "position": position})
+                    # e.g. "Some pads are wrong" is located at its first pad
+                    if record["position"] is None:
+                        record["position"] = position
+                continue
+
+            if s == Severity.WARNING and not warnings:
+                record = None
+                continue
+
+            record = {
+                "rule": self.name,
+                "url": self.url,
+                "library": library,
+                "item": item,
+                "file": filename,
+                "severity": "error" if s == Severity.ERROR else "warning",
+                "message": str(message),
+                "position": messagePosition(message),
+                "details": [],
+            }
+            records.append(record)
+
+        return records
+
+
+# The coordinates of the item (pin, pad, line, ...) a message is about, if any
+def messagePosition(message: Message) -> Optional[Dict[str, float]]:
+    if isinstance(message, BuiltMessage):
+        return message.position
+
+    if not isinstance(message, DeferredMessage):
+        return None
+
+    for arg in list(message.args) + list(message.kwargs.values()):
+        if isinstance(arg, DeferredMessage):
+            position = messagePosition(arg)
+            if position is not None:
+                return position
+        elif hasattr(arg, "posx") and hasattr(arg, "posy"):
+            # symbol items
+            return {"x": arg.posx, "y": arg.posy}
+        elif isinstance(arg, Mapping):
+            # footprint items (dicts and the edges of rects and polygons)
+            for key in ("pos", "start", "center"):
+                point = arg.get(key)
+                if isinstance(point, Mapping) and "x" in point and "y" in point:
+                    return {"x": point["x"], "y": point["y"]}
+
+    return None
+
+
+class ResultSink:
+    """
+    Receives the violations found by a checker while it runs, as records built
+    by KLCRuleBase.violations(). The records are written to a stream as soon
+    as they arrive, so other tools can consume them without parsing the text.
+    """
+
+    def __init__(self, stream: TextIO, tool: str):
+        self.stream = stream
+        self.tool = tool
+
+    def addRule(
+        self,
+        rule: KLCRuleBase,
+        library: str,
+        item: str,
+        filename: str,
+        warnings: bool = True,
+    ) -> None:
+        for record in rule.violations(library, item, filename, warnings):
+            self.add(record)
+
+    def add(self, record: Dict[str, Any]) -> None:
+        raise NotImplementedError("The add method must be implemented")
+
+    # finish the output, the stream itself is left open
+    def close(self) -> None:
+        self.stream.flush()
+
+
+class JsonLinesSink(ResultSink):
+    """
+    Writes every record as one line of JSON
+    """
+
+    def add(self, record: Dict[str, Any]) -> None:
+        self.stream.write(json.dumps(record, sort_keys=True) + "\n")
+        self.stream.flush()
+
+
+class SarifSink(ResultSink):
+    """
+    Writes a SARIF 2.1.0 log. The results are streamed, the rules that were
+    violated are added to the tool description at the end.
+    """
+
+    SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+
+    def __init__(self, stream: TextIO, tool: str):
+        super().__init__(stream, tool)
+        self.rules: Dict[str, Dict[str, Any]] = {}
+        self.count = 0
+        self.stream.write(
+            '{"$schema": %s, "version": "2.1.0", "runs": [{"results": ['
+            % json.dumps(self.SCHEMA)
+        )
+
+    def add(self, record: Dict[str, Any]) -> None:
+        rule = record["rule"]
+        if rule not in self.rules:
+            self.rules[rule] = {"id": rule, "helpUri": record["url"]}
+
+        text = record["message"]
+        for detail in record["details"]:
+            text += "\n" + detail["message"]
+
+        result = {
+            "ruleId": rule,
+            "level": record["severity"],
+            "message": {"text": text},
+            "locations": [
+                {
+                    "physicalLocation": {"artifactLocation": {"uri": record["file"]}},
+                    "logicalLocations": [
+                        {
+                            "name": record["item"],
+                            "fullyQualifiedName": record["library"]
+                            + ":"
+                            + record["item"],
+                        }
+                    ],
+                }
+            ],
+            "properties": {
+                "library": record["library"],
+                "item": record["item"],
+                "position": record["position"],
+                "details": record["details"],
+            },
+        }
+        if self.count:
+            self.stream.write(",")
+        self.stream.write("\n" + json.dumps(result, sort_keys=True))
+        self.stream.flush()
+        self.count += 1
+
+    def close(self) -> None:
+        driver = {"name": self.tool, "rules": list(self.rules.values())}
+        self.stream.write('\n], "tool": ' + json.dumps({"driver": driver}))
+        self.stream.write("}]}\n")
+        super().close()
+
+
+class BlockSink(ResultSink):
+    """
+    Collects the records in memory, used by the worker processes which pass
+    them to the sink of the main process together with their other results
+    """
+
+    def __init__(self):
+        self.records: List[Dict[str, Any]] = []
+
+    def add(self, record: Dict[str, Any]) -> None:
+        self.records.append(record)
+
+    def take(self) -> List[Dict[str, Any]]:
+        records = self.records
+        self.records = []
+        return records
+
+    def close(self) -> None:
+        pass
+
+
+# The sinks selected by the --format option of the checkers
+RESULT_SINKS = {"jsonl": JsonLinesSink, "sarif": SarifSink}
@@ -3,7 +3,7 @@ code extracted from: http://rosettacode.org/wiki/S-Expressions
 """
 
 import re
-from typing import Any, Optional
+from typing import Any, List, NamedTuple, Optional, Tuple
 
 dbg: bool = False
 
@@ -61,6 +61,169 @@ def _parse_sexp_internal(re_iter) -> Any:
             yield int(integer_num)
 
 
+# only parentheses and quoted strings matter when skipping a list
+skip_regex = re.compile(r'"(?:[^"\\]|\\.)*"|[()]')
+
+
+# Keeps track of the position of the last match
+class _Tracker:
+    def __init__(self, re_iter):
+        self.re_iter = re_iter
+        self.end: int = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        match = next(self.re_iter)
+        self.end = match.end()
+        return match
+
+
+def parse_sexp_sections(sexp: str, keys) -> Any:
+    """
+    Parse only the top-level lists whose first element is one of keys,
+    all other top-level lists are skipped without decoding them
+    """
+    term = re.compile(term_regex)
+
+    match = term.match(sexp)
+    if not match or not match.group(1):
+        raise SexprError('Missing initial opening parenthesis')
+
+    rv = []
+    pos = match.end()
+    while True:
+        match = term.match(sexp, pos)
+        if not match:
+            raise SexprError('Missing closing parenthesis')
+
+        lparen, rparen, *rest = match.groups()
+        if rparen:
+            return rv
+
+        if not lparen:
+            # a plain value of the top-level list (e.g. the footprint name)
+            rv += list(_parse_sexp_internal(iter([match])))
+            pos = match.end()
+            continue
+
+        key = term.match(sexp, match.end())
+        if key and key.group(6) in keys:
+            re_iter = _Tracker(term.finditer(sexp, match.end()))
+            rv.append(list(_parse_sexp_internal(re_iter)))
+            pos = re_iter.end
+            continue
+
+        # skip the list up to its matching closing parenthesis
+        pos = _skip_list(sexp, match.end())
+
+
+# Return the position after the closing parenthesis of the list opened before pos
+def _skip_list(sexp: str, pos: int) -> int:
+    depth = 1
+    for token in skip_regex.finditer(sexp, pos):
+        if token.group() == "(":
+            depth += 1
+        elif token.group() == ")":
+            depth -= 1
+            if depth == 0:
+                return token.end()
+
+    raise SexprError('Missing closing parenthesis')
+
+
+def top_level_spans(sexp: str) -> List[Tuple[int, int]]:
+    """
+    Return the (start, end) positions of all lists in the top-level list,
+    e.g. sexp[start:end] is the text of a footprint's pad
+    """
+    term = re.compile(term_regex)
+
+    match = term.match(sexp)
+    if not match or not match.group(1):
+        raise SexprError('Missing initial opening parenthesis')
+
+    spans = []
+    pos = match.end()
+    while True:
+        match = term.match(sexp, pos)
+        if not match:
+            raise SexprError('Missing closing parenthesis')
+
+        lparen, rparen, *rest = match.groups()
+        if rparen:
+            return spans
+
+        pos = match.end()
+        if lparen:
+            start = match.end() - 1
+            pos = _skip_list(sexp, pos)
+            spans.append((start, pos))
+
+
+# A value of parse_sexp_spans(), with its position and whether it was quoted
+class Atom(NamedTuple):
+    value: Any
+    start: int
+    end: int
+    quoted: bool
+
+
+# A list of parse_sexp_spans(), sexp[start:end] is its text
+class SpanList(list):
+    start: int = 0
+    end: int = 0
+
+
+def parse_sexp_spans(sexp: str) -> SpanList:
+    """
+    Parse a single list like parse_sexp(), but keep the position of every
+    value (Atom) and list (SpanList), so parts of the text can be replaced
+    """
+    term = re.compile(term_regex)
+
+    match = term.match(sexp)
+    if not match or not match.group(1):
+        raise SexprError('Missing initial opening parenthesis')
+
+    stack = [SpanList()]
+    stack[0].start = match.end() - 1
+    pos = match.end()
+    while True:
+        match = term.match(sexp, pos)
+        if not match:
+            raise SexprError('Missing closing parenthesis')
+        pos = match.end()
+
+        lparen, rparen, float_num, integer_num, quoted_str, bare_str = match.groups()
+        if lparen:
+            child = SpanList()
+            child.start = pos - 1
+            stack[-1].append(child)
+            stack.append(child)
+            continue
+
+        if rparen:
+            done = stack.pop()
+            done.end = pos
+            if not stack:
+                return done
+            continue
+
+        # the value without the whitespace in front of it
+        start = match.start(match.lastindex)
+        if bare_str is not None:
+            atom = Atom(bare_str, start, pos, False)
+        elif quoted_str is not None:
+            atom = Atom(quoted_str.replace('\\"', '"'), start - 1, pos, True)
+        elif float_num:
+            atom = Atom(float(float_num), start, pos, False)
+        else:
+            atom = Atom(int(integer_num), start, pos, False)
+        stack[-1].append(atom)
+
+
 # Form a valid sexpr (single line)
 def SexprItem(val: Any, key: Optional[str] = None) -> str:
     if key:
@@ -263,3 +426,11 @@ if __name__ == "__main__":
     ok = check(reparsed2) and ok
     if not ok:
         raise ImportError("parsed and re-parsed s-expressions differ")
+
+    if parse_sexp_sections(sexp, {"data"}) != parsed:
+        raise ImportError("parsed sections and parsed s-expression differ")
+    if parse_sexp_sections(sexp, set()) != []:
+        raise ImportError("skipped sections have been parsed")
+    spans = top_level_spans(sexp)
+    if [parse_sexp(sexp[start:end]) for start, end in spans] != parsed:
+        raise ImportError("top-level lists and parsed s-expression differ")
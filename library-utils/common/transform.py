@@ -0,0 +1,157 @@
+"""
+Library for 2D affine transformations (rotation, mirroring and translation).
+"""
+
+import math
+from typing import Any, Dict, List, Tuple
+
+# numpy is optional, it speeds up transforming large numbers of points
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# cos and sin of a rotation, exact for multiples of 90 degrees
+def _cosSin(degrees: float) -> Tuple[float, float]:
+    quarter = {0: (1.0, 0.0), 1: (0.0, 1.0), 2: (-1.0, 0.0), 3: (0.0, -1.0)}
+    if degrees % 90 == 0:
+        return quarter[int(degrees // 90) % 4]
+
+    radians = degrees * math.pi / 180
+    return math.cos(radians), math.sin(radians)
+
+
+class Transform:
+    """
+    An immutable 2D affine transformation, built from rotations, mirroring
+    and translations. Every method returns a new transformation, which
+    applies the existing one first, e.g. Transform().rotate(90).translate(1, 0)
+
+    Rotations follow the footprint convention: a point (x, y) rotated by
+    `degrees` becomes (x*cos - y*sin, x*sin + y*cos) and an orientation
+    is decreased by `degrees`.
+    """
+
+    def __init__(
+        self,
+        matrix: Tuple[float, float, float, float] = (1.0, 0.0, 0.0, 1.0),
+        offset: Tuple[float, float] = (0.0, 0.0),
+        angle: float = 0,
+        mirrored: bool = False,
+    ):
+        # x' = a*x + b*y + tx
+        # y' = c*x + d*y + ty
+        self.matrix: Tuple[float, float, float, float] = matrix
+        self.offset: Tuple[float, float] = offset
+
+        # the matrix is a rotation by angle, after a mirroring of y if mirrored
+        self.angle: float = angle
+        self.mirrored: bool = mirrored
+
+    def then(self, other: "Transform") -> "Transform":
+        """
+        Combine two transformations, other is applied after this one
+        """
+        a1, b1, c1, d1 = self.matrix
+        a2, b2, c2, d2 = other.matrix
+        tx, ty = self.offset
+
+        matrix = (
+            a2 * a1 + b2 * c1,
+            a2 * b1 + b2 * d1,
+            c2 * a1 + d2 * c1,
+            c2 * b1 + d2 * d1,
+        )
+        offset = (
+            a2 * tx + b2 * ty + other.offset[0],
+            c2 * tx + d2 * ty + other.offset[1],
+        )
+
+        # a mirroring reverses the direction of all previous rotations
+        if other.mirrored:
+            angle = other.angle - self.angle
+        else:
+            angle = self.angle + other.angle
+
+        return Transform(matrix, offset, angle, self.mirrored != other.mirrored)
+
+    def rotate(self, degrees: float) -> "Transform":
+        c, s = _cosSin(degrees)
+        return self.then(Transform((c, -s, s, c), angle=degrees))
+
+    def translate(self, x: float, y: float) -> "Transform":
+        return self.then(Transform(offset=(x, y)))
+
+    # Mirror the x coordinates (x -> -x)
+    def mirrorX(self) -> "Transform":
+        return self.then(Transform((-1.0, 0.0, 0.0, 1.0), angle=180, mirrored=True))
+
+    # Mirror the y coordinates (y -> -y)
+    def mirrorY(self) -> "Transform":
+        return self.then(Transform((1.0, 0.0, 0.0, -1.0), mirrored=True))
+
+    @property
+    def isIdentity(self) -> bool:
+        return self.matrix == (1.0, 0.0, 0.0, 1.0) and self.offset == (0.0, 0.0)
+
+    # True if horizontal and vertical lines stay horizontal and vertical
+    @property
+    def isAxisAligned(self) -> bool:
+        a, b, c, d = self.matrix
+        return (b == 0 and c == 0) or (a == 0 and d == 0)
+
+    def apply(self, x: float, y: float) -> Tuple[float, float]:
+        a, b, c, d = self.matrix
+        tx, ty = self.offset
+        return a * x + b * y + tx, c * x + d * y + ty
+
+    def applyOrientation(self, orientation: Any) -> Any:
+        # orientations are only given as numbers, anything else is kept
+        if not isinstance(orientation, (int, float)):
+            return orientation
+
+        if self.mirrored:
+            orientation = -orientation
+
+        return orientation - self.angle
+
+    def applyPoints(self, points: List[Dict[str, Any]]) -> None:
+        """
+        Transform a list of point dicts (with "x" and "y" keys) in place
+        """
+        if not points:
+            return
+
+        if numpy is not None:
+            a, b, c, d = self.matrix
+            xy = numpy.array([(p["x"], p["y"]) for p in points], dtype=float)
+            xy = xy @ numpy.array([[a, c], [b, d]]) + numpy.array(self.offset)
+            for p, (x, y) in zip(points, xy.tolist()):
+                p["x"] = x
+                p["y"] = y
+        else:
+            for p in points:
+                p["x"], p["y"] = self.apply(p["x"], p["y"])
+
+    def __repr__(self) -> str:
+        return "Transform(matrix={}, offset={}, angle={}, mirrored={})".format(
+            self.matrix, self.offset, self.angle, self.mirrored
+        )
+
+
+if __name__ == "__main__":
+    t1 = Transform().rotate(90).translate(1, 2)
+    t2 = Transform().mirrorX().rotate(30)
+    t3 = t1.then(t2)
+
+    print(t1.apply(1, 0))
+    print(t2.apply(1, 0), t2.applyOrientation(0))
+    print(t3.apply(1, 0), t3.applyOrientation(45))
+
+    points: List[Dict[str, Any]] = [{"x": 1, "y": 0}, {"x": 0, "y": 1}]
+    t1.applyPoints(points)
+    print(points)
+
+    if t3.apply(1, 0) != t2.apply(*t1.apply(1, 0)):
+        raise ValueError("combined transformation does not match")
@@ -214,7 +214,7 @@ class LibraryChecker:
 
         # logger.info('Footprint: {f:s}'.format(f=os.path.basename(filename)))
         try:
-            footprint = KicadMod(filename)
+            footprint = KicadMod(filename, sections={"models", "attr"})
         except FileNotFoundError:
             logger.fatal(
                 "EXIT: problem reading footprint file {fn:s}".format(fn=filename)
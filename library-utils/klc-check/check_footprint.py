@@ -1,12 +1,17 @@
 #!/usr/bin/env python3
 
 import argparse
+import cProfile
+import multiprocessing
 import os
+import pstats
 import re
 import sys
+import time
 import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from glob import glob
-from typing import List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 common = os.path.abspath(
     os.path.join(os.path.dirname(__file__), os.path.pardir, "common")
@@ -16,7 +21,16 @@ if common not in sys.path:
 
 from kicad_mod import KicadMod
 from print_color import PrintColor
-from rulebase import Verbosity, logError
+from rulebase import (
+    RESULT_SINKS,
+    BlockSink,
+    CostModel,
+    ErrorLog,
+    RuleTimings,
+    Verbosity,
+    requiredSections,
+    scheduleChunks,
+)
 from rules_footprint import get_all_footprint_rules
 from rules_footprint.rule import KLCRule
 
@@ -35,10 +49,10 @@ def check_library(filename: str, rules, metrics: List[str], args) -> Tuple[int,
         return (1, 0)
 
     if args.errors:
-        module = KicadMod(filename)
+        module = KicadMod(filename, release_tree=True, sections=sections)
     else:
         try:
-            module = KicadMod(filename)
+            module = KicadMod(filename, release_tree=True, sections=sections)
         except Exception as e:
             printer.red("Could not parse footprint: %s. (%s)" % (filename, e))
             if args.verbose:
@@ -62,6 +76,14 @@ def check_library(filename: str, rules, metrics: List[str], args) -> Tuple[int,
     return (ec, wc)
 
 
+# Call a method (check, fix, ...) of a rule, timed if --profile is given
+def call_rule(rule, phase: str, component: str) -> None:
+    if timings is None:
+        getattr(rule, phase)()
+    else:
+        timings.measure(rule.name, phase, component, getattr(rule, phase))
+
+
 def do_unittest(footprint, rules, metrics) -> Tuple[int, int]:
     error_count = 0
     m = re.match(r"(\w+)__(.+)__(.+)", footprint.name)
@@ -72,9 +94,9 @@ def do_unittest(footprint, rules, metrics) -> Tuple[int, int]:
     unittest_rule = m.group(2)
     unittest_descrp = m.group(3)  # noqa: F841
     for rule in rules:
-        rule = rule(footprint, args)
         if unittest_rule == rule.name:
-            rule.check()
+            rule.reset(footprint)
+            call_rule(rule, "check", footprint.name)
             if unittest_result == "Fail" and rule.errorCount == 0:
                 printer.red("Test '{foot}' failed".format(foot=footprint.name))
                 error_count += 1
@@ -101,11 +123,15 @@ def do_rulecheck(module, rules, metrics) -> Tuple[int, int]:
     wc = 0
     first = True
 
+    lib_name = os.path.basename(os.path.dirname(module.filename)).replace(".pretty", "")
+    component = lib_name + ":" + module.name
+    gating = args.fail_fast or args.first_error
+
     for rule in rules:
-        rule = rule(module, args)
+        rule.reset(module)
         if verbosity.value > Verbosity.HIGH.value:
             printer.white("Checking rule " + rule.name)
-        rule.check()
+        call_rule(rule, "check", component)
 
         # count errors
         if rule.hasErrors():
@@ -116,41 +142,125 @@ def do_rulecheck(module, rules, metrics) -> Tuple[int, int]:
         if args.nowarnings and not rule.hasErrors():
             continue
 
-        if rule.hasOutput():
+        if sink is not None:
+            # machine readable output, nothing is rendered as text
+            sink.addRule(
+                rule, lib_name, module.name, module.filename, not args.nowarnings
+            )
+        elif rule.hasOutput():
             if first:
                 printer.green("Checking footprint '{fp}':".format(fp=module.name))
                 first = False
 
             printer.yellow("Violating " + rule.name + " - " + rule.url, indentation=2)
-            rule.processOutput(printer, verbosity, args.silent)
+            # the gating modes only need the verdict, the messages are not built
+            if not gating:
+                rule.processOutput(printer, verbosity, args.silent)
 
         if rule.hasErrors():
-            if args.log:
-                lib_name = os.path.basename(os.path.dirname(module.filename)).replace(
-                    ".pretty", ""
-                )
-                logError(args.log, rule.name, lib_name, module.name)
+            if error_log:
+                error_log.add(rule.name, lib_name, module.name)
 
             if args.fix:
                 if args.fixmore and rule.needsFixMore:
-                    rule.fixmore()
-                rule.fix()
+                    call_rule(rule, "fixmore", component)
+                call_rule(rule, "fix", component)
+                # the rule might have changed the footprint data directly
+                module.invalidateCache()
                 rule.processOutput(printer, verbosity, args.silent)
-                rule.recheck()
+                call_rule(rule, "recheck", component)
+
+            # skip the remaining rules, --fail-fast also ends the whole run
+            if gating:
+                break
 
     # No messages?
-    if first:
+    if first and sink is None:
         if not args.silent:
             printer.green(
                 "Checking footprint '{fp}' - No errors".format(fp=module.name)
             )
 
     if ((args.fix or args.fixmore) and ec > 0) or args.rotate != 0:
-        module.save()
+        # the file is only written if it has been changed
+        if module.save():
+            updated_files.append(module.filename)
 
     return (ec, wc)
 
 
+# The name of the footprint in a file ("library:footprint"), its run time is
+# recorded under it
+def component_name(filename: str) -> str:
+    lib_name = os.path.basename(os.path.dirname(filename)).replace(".pretty", "")
+    return lib_name + ":" + os.path.splitext(os.path.basename(filename))[0]
+
+
+# Prepare a worker process, see the -j option. The workers are forked, they
+# inherit the rules and settings and only keep their results apart.
+def init_worker() -> None:
+    global sink, profiler
+
+    if sink is not None:
+        sink = BlockSink()
+    printer.buffered = True
+    # every worker writes its own profile, they are merged by the main process
+    if args.cprofile:
+        profiler = cProfile.Profile()
+
+
+# Check a file in a worker process. Returns everything the main process
+# needs to report it. A file that fails only loses its own results, the
+# other files of the chunk (maybe already fixed on disk) are still reported.
+def check_file(index: int) -> Dict[str, Any]:
+    if profiler:
+        profiler.enable()
+    start = time.perf_counter_ns()
+    error = None
+    try:
+        (ec, wc) = check_library(files[index], rules, metrics, args)
+    except Exception:
+        (ec, wc) = (0, 0)
+        error = traceback.format_exc()
+    ns = time.perf_counter_ns() - start
+    if profiler:
+        profiler.disable()
+        profiler.dump_stats("{}.{}".format(args.cprofile, os.getpid()))
+
+    result = {
+        "index": index,
+        "worker": os.getpid(),
+        "output": printer.buffer,
+        "metrics": metrics[:],
+        "records": sink.take() if sink else [],
+        "log": error_log.data if error_log else None,
+        "timings": timings.data if timings else None,
+        "updated": updated_files[:],
+        "errors": ec,
+        "warnings": wc,
+        "ns": ns,
+        "error": error,
+    }
+    printer.buffer = []
+    metrics.clear()
+    updated_files.clear()
+    if error_log:
+        error_log.data = {}
+    if timings:
+        timings.data = {}
+
+    # the other workers skip their remaining files
+    if args.fail_fast and ec > 0:
+        stop.set()
+    return result
+
+
+# Check a chunk of files in a worker process, None for the files skipped
+# after a --fail-fast error
+def check_chunk(indices: List[int]) -> List[Optional[Dict[str, Any]]]:
+    return [None if stop.is_set() else check_file(index) for index in indices]
+
+
 parser = argparse.ArgumentParser(
     description=(
         "Checks KiCad footprint files (.kicad_mod) against KiCad Library Convention"
@@ -213,18 +323,93 @@ parser.add_argument(
 parser.add_argument(
     "-m", "--metrics", help="generate a metrics.txt file", action="store_true"
 )
+parser.add_argument(
+    "--profile",
+    help="measure the run time of every rule per footprint and print a summary",
+    action="store_true",
+)
+parser.add_argument(
+    "--format",
+    help=(
+        "output format of the violations, jsonl and sarif stream machine readable"
+        " records to --output and skip the text output"
+    ),
+    choices=["text"] + sorted(RESULT_SINKS),
+    default="text",
+)
+parser.add_argument(
+    "-o",
+    "--output",
+    help="file for the jsonl or sarif records (default: stdout)",
+    metavar="FILE",
+)
+parser.add_argument(
+    "--fail-fast",
+    help=(
+        "stop the whole run at the first error, only the failing rule is reported"
+        " (for CI gating)"
+    ),
+    action="store_true",
+)
+parser.add_argument(
+    "--first-error",
+    help=(
+        "stop checking a footprint after its first failing rule, only the failing"
+        " rules are reported (for CI gating)"
+    ),
+    action="store_true",
+)
+parser.add_argument(
+    "--profile-json",
+    help="write the measured run times to a JSON file (implies --profile)",
+    metavar="FILE",
+)
+parser.add_argument(
+    "--cprofile",
+    help="run the checks under cProfile and write the stats to OUT",
+    metavar="OUT",
+)
+parser.add_argument(
+    "-j",
+    "--multiprocess",
+    help="number of worker processes (default: the number of CPUs)",
+)
+parser.add_argument(
+    "--costs",
+    help=(
+        "JSON file with the run times of previous runs (e.g. from --profile-json),"
+        " used to start the most expensive work first. The times measured in this"
+        " run are written back to it"
+    ),
+    metavar="FILE",
+)
 
 args = parser.parse_args()
 if args.fixmore:
     args.fix = True
-
-printer = PrintColor(use_color=not args.nocolor)
+if (args.fail_fast or args.first_error) and (args.fix or args.rotate != 0):
+    parser.error("--fail-fast and --first-error only check, they cannot fix or rotate")
+if args.unittest and args.format != "text":
+    parser.error("the unit tests only report passed and failed tests as text")
+
+# the violations are streamed to a sink in the machine readable formats,
+# the remaining console output goes to stderr then
+sink = None
+if args.format != "text":
+    sink_file = open(args.output, "w") if args.output else sys.stdout
+    sink = RESULT_SINKS[args.format](sink_file, "check_footprint")
+
+printer = PrintColor(
+    use_color=not args.nocolor, file=sys.stderr if sink is not None else None
+)
 
 # Set verbosity globally
 verbosity: Verbosity = Verbosity.NONE
 if args.verbose:
     verbosity = Verbosity(args.verbose)
 KLCRule.verbosity = verbosity
+# the fixes change the items, the messages about them are built before
+KLCRule.eagerMessages = args.fix
 
 # create a list of rules that should be checked
 if args.rule:
@@ -232,10 +417,18 @@ if args.rule:
 else:
     selected_rules = None
 
+# every rule is instantiated once and reset for each footprint
 rules = []
 for rule_name, rule in get_all_footprint_rules().items():
     if selected_rules is None or rule_name in selected_rules:
-        rules.append(rule.Rule)
+        rules.append(rule.Rule(None, args))
+
+# only the data read by the selected rules is loaded,
+# fixing or rotating writes the footprint back, so that needs all of it
+if args.fix or args.rotate != 0:
+    sections = None
+else:
+    sections = requiredSections(rules)
 
 # figure out which files should be checked
 files = []
@@ -246,14 +439,145 @@ if not files:
     printer.red("File argument invalid: {f}".format(f=args.kicad_mod_files))
     sys.exit(1)
 
+# the errors are collected and written to the log file at the end
+error_log = ErrorLog(args.log) if args.log else None
+
+# run time of the rules, if requested
+timings = RuleTimings() if args.profile or args.profile_json else None
+
+# the run time of every footprint is recorded, the most expensive ones are
+# started first in the next run
+costs = CostModel(args.costs)
+
+# one worker per CPU by default, but not more than there are files. The
+# workers are forked, without fork the files are checked one after another.
+jobs = int(args.multiprocess) if args.multiprocess else os.cpu_count() or 1
+jobs = max(1, min(jobs, len(files)))
+if "fork" not in multiprocessing.get_all_start_methods():
+    jobs = 1
+
 # now iterate over all files and check them
-metrics = []
+metrics: List[str] = []
+updated_files: List[str] = []
 error_count = 0
 warning_count = 0
-for filename in files:
-    (ec, wc) = check_library(filename, rules, metrics, args)
-    error_count += ec
-    warning_count += wc
+profiler: Optional[cProfile.Profile] = None
+# the output of every footprint is written at once
+printer.buffered = True
+if jobs == 1:
+    if args.cprofile:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    for filename in files:
+        start = time.perf_counter_ns()
+        (ec, wc) = check_library(filename, rules, metrics, args)
+        costs.record(component_name(filename), time.perf_counter_ns() - start)
+        printer.flush()
+        error_count += ec
+        warning_count += wc
+        # the remaining files are not checked
+        if args.fail_fast and ec > 0:
+            break
+    if args.cprofile:
+        profiler.disable()
+        profiler.dump_stats(args.cprofile)
+else:
+    context = multiprocessing.get_context("fork")
+    # set by the first worker that finds an error with --fail-fast
+    stop = context.Event()
+    # the workers must not write anything buffered before the fork again
+    sys.stdout.flush()
+    sys.stderr.flush()
+    if sink:
+        sink_file.flush()
+
+    # the most expensive files are checked first, by their recorded run
+    # time or their size
+    chunks = scheduleChunks(
+        costs.estimate(
+            [(component_name(f), os.path.getsize(f), "size") for f in files]
+        ),
+        jobs,
+    )
+
+    workers = set()
+    crashed = False
+    with ProcessPoolExecutor(
+        max_workers=jobs, mp_context=context, initializer=init_worker
+    ) as executor:
+        futures = {executor.submit(check_chunk, chunk): chunk for chunk in chunks}
+
+        # the results are written in the order of the files, each one as soon
+        # as it and the ones before it are done
+        done: Dict[int, Optional[Dict[str, Any]]] = {}
+        next_index = 0
+        stopped = False
+        for future in as_completed(futures):
+            chunk = futures[future]
+            if future.cancelled():
+                results = [None] * len(chunk)
+            else:
+                try:
+                    results = future.result()
+                except Exception:
+                    printer.red(
+                        "Could not check footprints: %s"
+                        % ", ".join(files[index] for index in chunk)
+                    )
+                    printer.flush()
+                    traceback.print_exc()
+                    crashed = True
+                    results = [None] * len(chunk)
+            done.update(zip(chunk, results))
+
+            while next_index in done:
+                result = done.pop(next_index)
+                next_index += 1
+                # skipped after a --fail-fast error
+                if result is None or stopped:
+                    continue
+
+                workers.add(result["worker"])
+                printer.buffer.extend(result["output"])
+                printer.flush()
+                if result["error"]:
+                    printer.red(
+                        "Could not check footprint: %s" % files[result["index"]]
+                    )
+                    printer.flush()
+                    sys.stderr.write(result["error"])
+                    crashed = True
+                metrics.extend(result["metrics"])
+                for record in result["records"]:
+                    sink.add(record)
+                if error_log:
+                    error_log.merge(result["log"])
+                if timings:
+                    timings.merge(result["timings"])
+                updated_files.extend(result["updated"])
+                costs.record(component_name(files[result["index"]]), result["ns"])
+                error_count += result["errors"]
+                warning_count += result["warnings"]
+
+                # the remaining files are not reported, like in a serial run
+                if args.fail_fast and result["errors"] > 0:
+                    stopped = True
+                    for f in futures:
+                        f.cancel()
+
+    if args.cprofile:
+        # merge the stats of all workers (a worker that crashed has none)
+        worker_stats = ["{}.{}".format(args.cprofile, w) for w in sorted(workers)]
+        worker_stats = [f for f in worker_stats if os.path.exists(f)]
+        if worker_stats:
+            stats = pstats.Stats(worker_stats[0])
+            for f in worker_stats[1:]:
+                stats.add(f)
+            stats.dump_stats(args.cprofile)
+            for f in worker_stats:
+                os.remove(f)
+printer.flush()
+printer.buffered = False
 
 # done checking all files
 if args.metrics or args.unittest:
@@ -262,9 +586,31 @@ if args.metrics or args.unittest:
         metrics_file.write(line + "\n")
     metrics_file.close()
 
-if args.fix:
+if sink:
+    sink.close()
+    if args.output:
+        sink_file.close()
+
+if error_log:
+    error_log.save()
+
+costs.save()
+
+if timings:
+    timings.report(printer)
+    if args.profile_json:
+        timings.save(args.profile_json)
+
+if updated_files:
     printer.light_red(
         "Some files were updated - ensure that they still load correctly in KiCad"
     )
 
+# a worker crashed, the results are incomplete
+if jobs > 1 and crashed:
+    sys.exit(-1)
+
+# the gating modes fail on errors only
+if args.fail_fast or args.first_error:
+    sys.exit(0 if error_count == 0 else -1)
 sys.exit(0 if error_count == 0 and warning_count == 0 else -1)
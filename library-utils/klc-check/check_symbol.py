@@ -1,16 +1,19 @@
 #!/usr/bin/env python3
 
 import argparse
+import cProfile
 import os
-import queue
+import pstats
 import re
 import sys
+import threading
 import time
 import traceback
 from functools import lru_cache
 from glob import glob  # enable windows wildcards
-from multiprocessing import JoinableQueue, Lock, Process, Queue
-from typing import List, Optional, Tuple
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import Event
+from typing import Any, Container, Dict, List, Optional, Tuple
 
 common = os.path.abspath(
     os.path.join(os.path.dirname(__file__), os.path.pardir, "common")
@@ -20,7 +23,17 @@ if common not in sys.path:
 
 from kicad_sym import KicadFileFormatError, KicadLibrary
 from print_color import PrintColor
-from rulebase import Verbosity, logError
+from rulebase import (
+    RESULT_SINKS,
+    BlockSink,
+    CostModel,
+    ErrorLog,
+    ResultSink,
+    RuleTimings,
+    Verbosity,
+    requiredSections,
+    scheduleChunks,
+)
 from rules_symbol import get_all_symbol_rules
 from rules_symbol.rule import KLCRule
 
@@ -35,19 +48,39 @@ class SymbolCheck:
         use_color: bool = True,
         no_warnings: bool = False,
         silent: bool = False,
-        log: bool = False,
+        log: Optional[str] = None,
+        profile: bool = False,
+        fail_fast: bool = False,
+        first_error: bool = False,
+        stop=None,
+        sink: Optional[ResultSink] = None,
     ):
         self.footprints = footprints
-        self.printer = PrintColor(use_color=use_color)
+        # the violations are streamed to the sink instead of printed, the
+        # remaining console output goes to stderr then
+        self.sink: Optional[ResultSink] = sink
+        self.printer = PrintColor(
+            use_color=use_color, file=sys.stderr if sink is not None else None
+        )
         self.verbosity: Verbosity = verbosity
         self.metrics: List[str] = []
         self.no_warnings: bool = no_warnings
-        self.log: bool = log
+        # the errors are only collected here, see ErrorLog.save()
+        self.error_log: Optional[ErrorLog] = ErrorLog(log) if log else None
+        # run time of the rules, if requested
+        self.timings: Optional[RuleTimings] = RuleTimings() if profile else None
         self.silent: bool = silent
+        # CI gating: stop the whole run (fail_fast) or the symbol (first_error)
+        # at the first error, the messages of the rules are not rendered then
+        self.fail_fast: bool = fail_fast
+        self.first_error: bool = first_error
+        # set once a fail_fast check found an error, can be shared by workers
+        self.stop = stop if stop is not None else threading.Event()
         self.error_count: int = 0
         self.warning_count: int = 0
 
         # build a list of rules to work with
+        # every rule is instantiated once and reset for each symbol
         self.rules: List[KLCRule] = []
 
         for rule_name, rule in get_all_symbol_rules().items():
@@ -55,7 +88,18 @@ class SymbolCheck:
                 if excluded_rules is not None and rule_name in excluded_rules:
                     pass
                 else:
-                    self.rules.append(rule.Rule)
+                    self.rules.append(rule.Rule(None, footprints_dir=footprints))
+
+        # only the parts of the symbols read by the selected rules are loaded
+        self.sections = requiredSections(self.rules)
+
+    # Call a method (check, fix, ...) of a rule, timed if profiling is enabled
+    def call_rule(self, rule: KLCRule, phase: str, symbol) -> None:
+        if self.timings is None:
+            getattr(rule, phase)()
+        else:
+            component = symbol.libname + ":" + symbol.name
+            self.timings.measure(rule.name, phase, component, getattr(rule, phase))
 
     def do_unittest(self, symbol) -> Tuple[int, int]:
         error_count = 0
@@ -67,10 +111,9 @@ class SymbolCheck:
         unittest_rule = m.group(2)
         unittest_descrp = m.group(3)  # noqa: F841
         for rule in self.rules:
-            rule.footprints_dir = self.footprints
-            rule = rule(symbol)
             if unittest_rule == rule.name:
-                rule.check()
+                rule.reset(symbol)
+                self.call_rule(rule, "check", symbol)
                 if unittest_result == "Fail" and rule.errorCount == 0:
                     self.printer.red("Test '{sym}' failed".format(sym=symbol.name))
                     error_count += 1
@@ -95,18 +138,27 @@ class SymbolCheck:
         symbol_error_count = 0
         symbol_warning_count = 0
         first = True
+        gating = self.fail_fast or self.first_error
         for rule in self.rules:
-            rule.footprints_dir = self.footprints
-            rule = rule(symbol)
+            rule.reset(symbol)
 
             if self.verbosity.value > Verbosity.HIGH.value:
                 self.printer.white("Checking rule " + rule.name)
-            rule.check()
+            self.call_rule(rule, "check", symbol)
 
             if self.no_warnings and not rule.hasErrors():
                 continue
 
-            if rule.hasOutput():
+            if self.sink is not None:
+                # machine readable output, nothing is rendered as text
+                self.sink.addRule(
+                    rule,
+                    symbol.libname,
+                    symbol.name,
+                    symbol.filename,
+                    warnings=not self.no_warnings,
+                )
+            elif rule.hasOutput():
                 if first:
                     self.printer.green(
                         "Checking symbol '{lib}:{sym}':".format(
@@ -118,18 +170,26 @@ class SymbolCheck:
                 self.printer.yellow(
                     "Violating " + rule.name + " - " + rule.url, indentation=2
                 )
-                rule.processOutput(self.printer, self.verbosity, self.silent)
+                # the gating modes only need the verdict, the messages are not built
+                if not gating:
+                    rule.processOutput(self.printer, self.verbosity, self.silent)
 
             if rule.hasErrors():
-                if self.log:
-                    logError(self.log, rule.name, symbol.libname, symbol.name)
+                if self.error_log:
+                    self.error_log.add(rule.name, symbol.libname, symbol.name)
 
             # increment the number of violations
             symbol_error_count += rule.errorCount
             symbol_warning_count += rule.warningCount()
 
+            # skip the remaining rules (and symbols, for fail_fast)
+            if gating and rule.hasErrors():
+                if self.fail_fast:
+                    self.stop.set()
+                break
+
         # No messages?
-        if first:
+        if first and self.sink is None:
             if not self.silent:
                 self.printer.green(
                     "Checking symbol '{lib}:{sym}':".format(
@@ -153,10 +213,28 @@ class SymbolCheck:
 
     @lru_cache(maxsize=None)
     def _load_library(self, filename):
-        return KicadLibrary.from_file(filename)
+        return KicadLibrary.from_file(filename, sections=self.sections)
 
+    # Called after every checked symbol, with its index in the library, its
+    # name ("library:symbol") and how long it took in ns
+    def symbol_checked(self, index: int, component: str, ns: int) -> None:
+        pass
+
+    # Called when all symbols of a library are checked
+    def library_checked(self, libname: str, error_count: int, warning_count: int):
+        self.metrics += library_metrics(libname, error_count, warning_count)
+        self.error_count += error_count
+        self.warning_count += warning_count
+
+    # Check the symbols of a library, or only the ones with the given indices
+    # (a shard of the library)
     def check_library(
-        self, filename: str, component=None, pattern=None, is_unittest: bool = False
+        self,
+        filename: str,
+        component=None,
+        pattern=None,
+        is_unittest: bool = False,
+        symbols: Optional[Container[int]] = None,
     ) -> Tuple[int, int]:
         error_count = 0
         warning_count = 0
@@ -178,7 +256,14 @@ class SymbolCheck:
                 traceback.print_exc()
             return (1, 0)
 
-        for symbol in library.symbols:
+        for index, symbol in enumerate(library.symbols):
+            # a fail_fast check (maybe in another worker) found an error
+            if self.stop.is_set():
+                break
+
+            if symbols is not None and index not in symbols:
+                continue
+
             if component:
                 if component.lower() != symbol.name.lower():
                     continue
@@ -188,6 +273,7 @@ class SymbolCheck:
                     continue
 
             # check which kind of tests we want to run
+            start = time.perf_counter_ns()
             if is_unittest:
                 (ec, wc) = self.do_unittest(symbol)
             else:
@@ -196,30 +282,61 @@ class SymbolCheck:
             error_count += ec
             warning_count += wc
             libname = symbol.libname
+            self.symbol_checked(
+                index,
+                symbol.libname + ":" + symbol.name,
+                time.perf_counter_ns() - start,
+            )
 
         # done checking the lib
-        self.metrics.append("{lib}.total_errors {n}".format(lib=libname, n=error_count))
-        self.metrics.append(
-            "{lib}.total_warnings {n}".format(lib=libname, n=warning_count)
-        )
-        self.error_count += error_count
-        self.warning_count += warning_count
+        self.library_checked(libname, error_count, warning_count)
         return (error_count, warning_count)
 
 
-def worker(
-    inp,
-    outp,
-    lock,
-    selected_rules,
-    excluded_rules,
-    verbosity: Verbosity,
-    footprints,
-    args,
-    i=0,
-):
-    # have one instance of SymbolCheck per worker
-    c = SymbolCheck(
+# The metrics lines of a checked library
+def library_metrics(libname: str, error_count: int, warning_count: int) -> List[str]:
+    return [
+        "{lib}.total_errors {n}".format(lib=libname, n=error_count),
+        "{lib}.total_warnings {n}".format(lib=libname, n=warning_count),
+    ]
+
+
+class WorkerCheck(SymbolCheck):
+    """
+    The SymbolCheck of a worker process. The output of every symbol is kept
+    apart, so that the shards of a library checked by different workers can
+    be merged in the order of the symbols by the main process.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.printer.buffered = True
+        self.blocks: List[Dict[str, Any]] = []
+        self.totals: Optional[Tuple[str, int, int]] = None
+
+    def symbol_checked(self, index: int, component: str, ns: int) -> None:
+        self.blocks.append(
+            {
+                "index": index,
+                "component": component,
+                "ns": ns,
+                "output": self.printer.buffer,
+                "metrics": self.metrics,
+                "records": self.sink.take() if self.sink else [],
+            }
+        )
+        self.printer.buffer = []
+        self.metrics = []
+
+    # the totals of the shards are added up by the main process
+    def library_checked(self, libname: str, error_count: int, warning_count: int):
+        self.totals = (libname, error_count, warning_count)
+
+
+def make_checker(
+    selected_rules, excluded_rules, verbosity: Verbosity, footprints, args, stop
+) -> WorkerCheck:
+    return WorkerCheck(
         selected_rules,
         excluded_rules,
         verbosity,
@@ -228,27 +345,126 @@ def worker(
         no_warnings=args.nowarnings,
         silent=args.silent,
         log=args.log,
+        profile=args.profile or bool(args.profile_json),
+        fail_fast=args.fail_fast,
+        first_error=args.first_error,
+        stop=stop,
+        sink=BlockSink() if args.format != "text" else None,
     )
-    c.printer.buffered = True
 
-    while True:
-        try:
-            fn = inp.get(block=False)
-            # run the check on this file
-            c.check_library(fn, args.component, args.pattern, args.unittest)
-            # print the console output, all at once while we have the lock
-            lock.acquire()
-            c.printer.flush()
-            lock.release()
-            # signal that we are done with this item
-            inp.task_done()
-        except queue.Empty:
-            break
-
-    # output all the metrics at once
-    for line in c.metrics:
-        outp.put("{},{}".format(i, line))
-    return
+
+# The SymbolCheck of a worker process, see init_worker()
+# The main process sets it when it shards libraries, forked workers inherit
+# it together with the libraries it has already loaded
+checker: Optional[WorkerCheck] = None
+worker_args = None
+profiler: Optional[cProfile.Profile] = None
+
+
+def init_worker(
+    selected_rules,
+    excluded_rules,
+    verbosity: Verbosity,
+    footprints,
+    args,
+    stop,
+) -> None:
+    global checker, worker_args, profiler
+
+    # have one instance of SymbolCheck per worker process
+    KLCRule.verbosity = verbosity
+    if checker is None:
+        checker = make_checker(
+            selected_rules, excluded_rules, verbosity, footprints, args, stop
+        )
+    worker_args = args
+
+    # every worker writes its own profile, they are merged by the main process
+    if args.cprofile:
+        profiler = cProfile.Profile()
+
+
+# Check a file, or a shard of its symbols, in a worker process. Returns
+# everything the main process needs to report it, or None if it was skipped
+def check_file(
+    filename: str, symbols: Optional[List[int]] = None
+) -> Optional[Dict[str, Any]]:
+    c = checker
+    args = worker_args
+
+    # a fail_fast check (maybe in another worker) found an error
+    if c.stop.is_set():
+        return None
+
+    if profiler:
+        profiler.enable()
+    c.check_library(filename, args.component, args.pattern, args.unittest, symbols)
+    if profiler:
+        profiler.disable()
+        profiler.dump_stats("{}.{}".format(args.cprofile, os.getpid()))
+
+    result = {
+        "worker": os.getpid(),
+        # the output of a library that could not be loaded
+        "output": c.printer.buffer,
+        "symbols": c.blocks,
+        "totals": c.totals,
+        "log": c.error_log.data if c.error_log else None,
+        "timings": c.timings.data if c.timings else None,
+    }
+    c.printer.buffer = []
+    c.blocks = []
+    c.totals = None
+    if c.error_log:
+        c.error_log.data = {}
+    if c.timings:
+        c.timings.data = {}
+    return result
+
+
+# The heuristic cost of a symbol, used if no time is recorded for it
+def symbol_cost(symbol) -> float:
+    return max(1, len(symbol.pins)) * max(1, symbol.unit_count)
+
+
+# Print the console output and collect the results of a checked file,
+# the results of its shards are merged in the order of the symbols
+def write_results(
+    results: List[Dict[str, Any]],
+    printer: PrintColor,
+    metrics: List[str],
+    sink: Optional[ResultSink],
+    error_log: Optional[ErrorLog],
+    timings: Optional[RuleTimings],
+    costs: CostModel,
+) -> None:
+    blocks = []
+    for result in results:
+        printer.buffer.extend(result["output"])
+        blocks += result["symbols"]
+
+    for block in sorted(blocks, key=lambda block: block["index"]):
+        printer.buffer.extend(block["output"])
+        metrics.extend(block["metrics"])
+        for record in block["records"]:
+            sink.add(record)
+        costs.record(block["component"], block["ns"])
+    printer.flush()
+
+    totals = [result["totals"] for result in results if result["totals"]]
+    if totals:
+        libname = ""
+        for name, ec, wc in totals:
+            libname = libname or name
+        metrics += library_metrics(
+            libname, sum(t[1] for t in totals), sum(t[2] for t in totals)
+        )
+
+    for result in results:
+        if error_log:
+            error_log.merge(result["log"])
+        if timings:
+            timings.merge(result["timings"])
 
 
 if __name__ == "__main__":
@@ -323,7 +539,69 @@ if __name__ == "__main__":
         help="unit test mode (to be used with test-symbols)",
         action="store_true",
     )
-    parser.add_argument("-j", "--multiprocess", help="use parallel processing")
+    parser.add_argument(
+        "-j",
+        "--multiprocess",
+        help="number of worker processes (default: the number of CPUs)",
+    )
+    parser.add_argument(
+        "--format",
+        help=(
+            "output format of the violations, jsonl and sarif stream machine"
+            " readable records to --output and skip the text output"
+        ),
+        choices=["text"] + sorted(RESULT_SINKS),
+        default="text",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        help="file for the jsonl or sarif records (default: stdout)",
+        metavar="FILE",
+    )
+    parser.add_argument(
+        "--costs",
+        help=(
+            "JSON file with the run times of previous runs (e.g. from"
+            " --profile-json), used to start the most expensive work first. The"
+            " times measured in this run are written back to it"
+        ),
+        metavar="FILE",
+    )
+    parser.add_argument(
+        "--fail-fast",
+        help=(
+            "stop the whole run at the first error, only the failing rule is"
+            " reported (for CI gating)"
+        ),
+        action="store_true",
+    )
+    parser.add_argument(
+        "--first-error",
+        help=(
+            "stop checking a symbol after its first failing rule, only the failing"
+            " rules are reported (for CI gating)"
+        ),
+        action="store_true",
+    )
+    parser.add_argument(
+        "--profile",
+        help="measure the run time of every rule per symbol and print a summary",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--profile-json",
+        help="write the measured run times to a JSON file (implies --profile)",
+        metavar="FILE",
+    )
+    parser.add_argument(
+        "--cprofile",
+        help=(
+            "run the workers under cProfile, write their stats to OUT.<worker> and"
+            " the merged stats to OUT"
+        ),
+        metavar="OUT",
+    )
     parser.add_argument(
         "--footprints",
         help=(
@@ -332,6 +610,8 @@ if __name__ == "__main__":
         ),
     )
     args = parser.parse_args()
+    if args.unittest and args.format != "text":
+        parser.error("the unit tests only report passed and failed tests as text")
 
     #
     if args.rule:
@@ -370,52 +650,114 @@ if __name__ == "__main__":
     if not args.unittest:
         files.sort(key=lambda filename: filename[1], reverse=True)
 
-    # Create queues for multiprocessing
-    task_queue = JoinableQueue()
-    out_queue = Queue()
-
-    for (filename, size) in files:
-        task_queue.put(filename)
-
-    jobs = []
-    job_output = {}
-
-    # create the workers
-    lock = Lock()
-    for i in range(int(args.multiprocess) if args.multiprocess else 1):
-        p = Process(
-            target=worker,
-            args=(
-                task_queue,
-                out_queue,
-                lock,
-                selected_rules,
-                excluded_rules,
-                verbosity,
-                footprints,
-                args,
-                i,
-            ),
+    job_output: List[str] = []
+    # set by the first worker that finds an error with --fail-fast
+    stop = Event()
+
+    # the records of all workers end up in one sink
+    sink = None
+    if args.format != "text":
+        sink_file = open(args.output, "w") if args.output else sys.stdout
+        sink = RESULT_SINKS[args.format](sink_file, "check_symbol")
+    printer = PrintColor(
+        use_color=not args.nocolor, file=sys.stderr if sink else None, buffered=True
+    )
+    error_log = ErrorLog(args.log) if args.log else None
+    timings = RuleTimings() if args.profile or args.profile_json else None
+
+    # one worker per CPU by default, but not more than there is work for
+    jobs = int(args.multiprocess) if args.multiprocess else os.cpu_count() or 1
+    jobs = max(1, jobs)
+
+    # the cost of the work items is estimated from the times recorded by
+    # previous runs (if any), or from the size of the files and symbols
+    costs = CostModel(args.costs)
+
+    # with fewer files than workers the symbols of a library are split between
+    # the workers, the libraries are loaded once here to estimate their costs
+    items: List[Tuple[str, Optional[List[int]]]] = []
+    heuristics: List[Tuple[str, float, str]] = []
+    sharded = set()
+    if jobs > len(files):
+        checker = make_checker(
+            selected_rules, excluded_rules, verbosity, footprints, args, stop
         )
-        jobs.append(p)
-        p.start()
-        job_output[str(i)] = []
-
-    # wait for all workers to finish
-    while jobs:
-        for p in jobs:
-            while True:
+        for (filename, size) in files:
+            try:
+                library = checker._load_library(filename)
+            except Exception:
+                # the worker reports the problem
+                continue
+            if not library.symbols:
+                continue
+            sharded.add(filename)
+            for index, symbol in enumerate(library.symbols):
+                items.append((filename, [index]))
+                heuristics.append(
+                    (symbol.libname + ":" + symbol.name, symbol_cost(symbol), "pins")
+                )
+    for (filename, size) in files:
+        if filename not in sharded:
+            items.append((filename, None))
+            library_name = os.path.splitext(os.path.basename(filename))[0]
+            heuristics.append((library_name, size, "size"))
+
+    # the largest chunks of work are started first, the chunks of symbols are
+    # split up by library as a worker checks one library at a time
+    tasks: List[Tuple[str, Optional[List[int]]]] = []
+    for chunk in scheduleChunks(costs.estimate(heuristics), jobs):
+        shards: Dict[str, Optional[List[int]]] = {}
+        for i in chunk:
+            filename, symbols = items[i]
+            if symbols is None:
+                shards[filename] = None
+            else:
+                shards.setdefault(filename, []).extend(symbols)
+        for filename, symbols in shards.items():
+            tasks.append((filename, sorted(symbols) if symbols else None))
+
+    workers = set()
+    crashed = False
+    with ProcessPoolExecutor(
+        max_workers=max(1, min(jobs, len(tasks))),
+        initializer=init_worker,
+        initargs=(selected_rules, excluded_rules, verbosity, footprints, args, stop),
+    ) as executor:
+        futures: Dict[str, List[Future]] = {}
+        for filename, symbols in tasks:
+            future = executor.submit(check_file, filename, symbols)
+            futures.setdefault(filename, []).append(future)
+
+        # the results are written in the order of the files, each one as soon
+        # as it and the ones before it are done
+        for (filename, size) in files:
+            results = []
+            for future in futures.get(filename, []):
+                if future.cancelled():
+                    continue
                 try:
-                    identifier, line = out_queue.get(block=False).split(",")
-                    job_output[identifier].append(line)
-                except queue.Empty:
-                    break
-            if not p.is_alive():
-                jobs.remove(p)
+                    result = future.result()
+                except Exception:
+                    printer.red("Could not check library: %s" % filename)
+                    printer.flush()
+                    traceback.print_exc()
+                    crashed = True
+                    continue
 
-    out_queue.put("STOP")
+                # skipped after a --fail-fast error
+                if result is not None:
+                    workers.add(result["worker"])
+                    results.append(result)
+
+            write_results(
+                results, printer, job_output, sink, error_log, timings, costs
+            )
 
-    time.sleep(1)
+            # with --fail-fast the files which have not been started are dropped
+            if stop.is_set():
+                for file_futures in futures.values():
+                    for f in file_futures:
+                        f.cancel()
 
     # done checking all files
     error_count = 0
@@ -424,14 +766,53 @@ if __name__ == "__main__":
     if args.metrics or args.unittest:
         metrics_file = open("metrics.txt", "a+")
 
-        for key in job_output:
-            for line in job_output[key]:
-                metrics_file.write(line + "\n")
-                if ".total_errors" in line:
-                    error_count += int(line.split()[-1])
-                if ".total_warnings" in line:
-                    warning_count += int(line.split()[-1])
+        for line in job_output:
+            metrics_file.write(line + "\n")
+            if ".total_errors" in line:
+                error_count += int(line.split()[-1])
+            if ".total_warnings" in line:
+                warning_count += int(line.split()[-1])
 
         metrics_file.close()
-    out_queue.close()
+    elif args.fail_fast or args.first_error:
+        # the exit code is all that the gating modes are used for
+        for line in job_output:
+            if ".total_errors" in line:
+                error_count += int(line.split()[-1])
+
+    if sink:
+        sink.close()
+        if args.output:
+            sink_file.close()
+
+    if error_log:
+        error_log.save()
+
+    costs.save()
+
+    if timings:
+        printer.buffered = False
+        timings.report(printer)
+        if args.profile_json:
+            timings.save(args.profile_json)
+
+    if args.cprofile:
+        # merge the stats of all workers (a worker that crashed has none)
+        worker_stats = ["{}.{}".format(args.cprofile, w) for w in sorted(workers)]
+        worker_stats = [f for f in worker_stats if os.path.exists(f)]
+        if worker_stats:
+            stats = pstats.Stats(worker_stats[0])
+            for f in worker_stats[1:]:
+                stats.add(f)
+            stats.dump_stats(args.cprofile)
+            for f in worker_stats:
+                os.remove(f)
+
+    # a worker crashed, the results are incomplete
+    if crashed:
+        sys.exit(-1)
+
+    # the gating modes fail on errors only
+    if args.fail_fast or args.first_error:
+        sys.exit(0 if error_count == 0 else -1)
     sys.exit(0 if error_count == 0 and warning_count == 0 else -1)
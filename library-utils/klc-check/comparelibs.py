@@ -6,6 +6,7 @@ components have been changed.
 """
 
 import argparse
+import cProfile
 import difflib
 import filecmp
 import fnmatch
@@ -103,6 +104,11 @@ parser.add_argument(
         ' "~/kicad/footprints/"'
     ),
 )
+parser.add_argument(
+    "--cprofile",
+    help="run the comparison under cProfile and write the stats to OUT",
+    metavar="OUT",
+)
 
 (args, extra) = parser.parse_known_args()
 printer = PrintColor(use_color=not args.nocolor)
@@ -137,6 +143,10 @@ def build_library_dict(filelist):
     return libs
 
 
+if args.cprofile:
+    profiler = cProfile.Profile()
+    profiler.enable()
+
 # prepare variables
 new_libs = build_library_dict(args.new)
 old_libs = build_library_dict(args.old)
@@ -293,5 +303,9 @@ for lib_name in old_libs:
         if args.design_breaking_changes:
             design_breaking_changes += 1
 
+if args.cprofile:
+    profiler.disable()
+    profiler.dump_stats(args.cprofile)
+
 # Return the number of errors found ( zero if --check is not set )
 sys.exit(errors + design_breaking_changes)
@@ -6,10 +6,17 @@
 from rules_footprint.rule import KLCRule, getStartPoint, getEndPoint, graphItemString
 import math
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 class Rule(KLCRule):
     """Basic geometry checks"""
 
+    sections = frozenset(["lines"])
+
     # set thresholds for tested angle
     smallAngle = math.radians(2.0)
     verySmallAngle = math.radians(0.4)
@@ -59,6 +66,31 @@ class Rule(KLCRule):
 
         return
 
+    def getStrangeLinesVectorized(self, layer):
+
+        lines = self.module.filterLines(layer)
+        a = self.module.lineArray(layer)
+
+        p1x = numpy.abs(a[:, 2] - a[:, 0])
+        p1y = numpy.abs(a[:, 3] - a[:, 1])
+
+        # a 0 length line
+        null = (p1x == 0) & (p1y == 0)
+        # really h or v ?
+        hv = (p1x == 0) | (p1y == 0)
+
+        # angle against the horizontal or vertical axis, whichever is closer
+        d1 = numpy.hypot(p1x, p1y)
+        d2 = numpy.maximum(p1x, p1y)
+        A = numpy.arctan2(numpy.minimum(p1x, p1y), d2)
+
+        low = ~hv & ((d1 < 1e-6) | (d2 < 1e-6) | (A < self.verySmallAngle))
+        strange = ~hv & ~low & (A < self.smallAngle)
+
+        self.nullLines.extend(lines[i] for i in numpy.flatnonzero(null))
+        self.hvLines.extend(lines[i] for i in numpy.flatnonzero(low))
+        self.strangeLines.extend(lines[i] for i in numpy.flatnonzero(strange))
+
     def check(self):
         """
         Proceeds the checking of the rule.
@@ -71,26 +103,29 @@ class Rule(KLCRule):
             self.strangeLines.clear()
             self.nullLines.clear()
             self.hvLines.clear()
-            self.getStrangeLines(self.module.filterLines(layer))
+            if numpy is not None:
+                self.getStrangeLinesVectorized(layer)
+            else:
+                self.getStrangeLines(self.module.filterLines(layer))
 
             if len(self.nullLines) > 0:
                 self.warning("Zero length lines")
                 self.warningExtra("The following lines have 0 length")
                 for bad in self.nullLines:
-                    self.warningExtra(graphItemString(bad, layer=True, width=False))
+                    self.warningExtra(graphItemString, bad, layer=True, width=False)
 
             if len(self.hvLines) > 0:
                 self.warning("Low angle")
                 self.warningExtra("The following lines should be vertical or horizontal")
                 for bad in self.hvLines:
-                    self.warningExtra(graphItemString(bad, layer=True, width=False))
+                    self.warningExtra(graphItemString, bad, layer=True, width=False)
 
             if len(self.strangeLines) > 0:
                 self.warning("Verticality / horizontality")
                 self.warningExtra(
                     "The following lines might be slightly not horizontal or vertical")
                 for bad in self.strangeLines:
-                    self.warningExtra(graphItemString(bad, layer=True, width=False))
+                    self.warningExtra(graphItemString, bad, layer=True, width=False)
 
         return 0  # There is no KLC rule for this so this check only generates warnings
 
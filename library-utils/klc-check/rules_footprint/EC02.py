@@ -6,6 +6,8 @@ from rules_footprint.rule import KLCRule
 class Rule(KLCRule):
     """Pad shape checks"""
 
+    sections = frozenset(["pads"])
+
     def check(self):
         # Check that smd pads are not rectangle
         bad_pads = []
@@ -2,21 +2,23 @@ import cmath
 from copy import deepcopy
 from typing import Any, Dict, List
 
-from kicad_mod import KicadMod
+from kicad_mod import KicadMod, Segment
 from rules_footprint.klc_constants import (
     KLC_SILK_WIDTH,
     KLC_SILK_WIDTH_ALLOWED,
     KLC_TEXT_SIZE,
     KLC_TEXT_THICKNESS,
 )
-from rules_footprint.rule import KLCRule, graphItemString
+from rules_footprint.rule import KLCRule, graphItemString, graphSource
 
 
 class Rule(KLCRule):
     """Silkscreen layer requirements"""
 
-    def __init__(self, component: KicadMod, args):
-        super().__init__(component, args)
+    sections = KicadMod.GRAPHIC_SECTIONS | {"pads", "texts"}
+
+    def reset(self, component: KicadMod) -> None:
+        super().reset(component)
 
         self.refDesError: bool = False
 
@@ -324,7 +326,7 @@ class Rule(KLCRule):
                 "= {allowed} mm".format(allowed=KLC_SILK_WIDTH_ALLOWED)
             )
             for g in self.bad_width:
-                self.errorExtra(graphItemString(g, layer=True, width=True))
+                self.errorExtra(graphItemString, g, layer=True, width=True)
 
         if len(self.non_nominal_width) > 0:
             self.warning(
@@ -332,7 +334,7 @@ class Rule(KLCRule):
                 "width of {width} mm".format(width=KLC_SILK_WIDTH)
             )
             for g in self.non_nominal_width:
-                self.warningExtra(graphItemString(g, layer=True, width=True))
+                self.warningExtra(graphItemString, g, layer=True, width=True)
 
         # Display message if silkscreen was found intersecting with pad
         if self.intersections:
@@ -341,11 +343,8 @@ class Rule(KLCRule):
             for ints in self.intersections:
                 if not ints["pad"]["number"] in pad_nums:
                     self.errorExtra(
-                        " - Pad {n} @ ({x},{y})".format(
-                            n=ints["pad"]["number"],
-                            x=ints["pad"]["pos"]["x"],
-                            y=ints["pad"]["pos"]["y"],
-                        )
+                        " - Pad {pad[number]} @ ({pad[pos][x]},{pad[pos][y]})",
+                        pad=ints["pad"],
                     )
                     pad_nums.append(ints["pad"]["number"])
 
@@ -371,11 +370,19 @@ class Rule(KLCRule):
                     ref["font"]["height"] = KLC_TEXT_SIZE
                     ref["font"]["thickness"] = KLC_TEXT_THICKNESS
             for graph in self.bad_width:
-                graph["width"] = KLC_SILK_WIDTH
+                graphSource(graph)["width"] = KLC_SILK_WIDTH
             for inter in self.intersections:
                 pad = inter["pad"]
                 graph = inter["graph"]
-                if "angle" in graph:
+                if isinstance(graph, Segment):
+                    # only lines can be cut back, a rect or polygon would have
+                    # to be split up into lines first
+                    self.info(
+                        "Silkscreen {0} intersects with pad {1}, fix it manually",
+                        graphItemString(graph),
+                        pad["number"],
+                    )
+                elif "angle" in graph:
                     # TODO
                     pass
                 elif "center" in graph:
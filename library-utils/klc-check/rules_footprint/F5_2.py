@@ -15,14 +15,16 @@ from rules_footprint.klc_constants import (
     KLC_TEXT_THICKNESS_MAX,
     KLC_TEXT_THICKNESS_MIN,
 )
-from rules_footprint.rule import KLCRule, graphItemString, mapToGrid
+from rules_footprint.rule import KLCRule, graphItemString, graphSource, mapToGrid
 
 
 class Rule(KLCRule):
     """Fabrication layer requirements"""
 
-    def __init__(self, component: KicadMod, args):
-        super().__init__(component, args)
+    sections = KicadMod.GRAPHIC_SECTIONS | {"attr", "pads", "texts"}
+
+    def reset(self, component: KicadMod) -> None:
+        super().reset(component)
 
         self.bad_fabrication_width: List[Dict[str, Any]] = []
         self.non_nominal_width: List[Dict[str, Any]] = []
@@ -222,7 +224,7 @@ class Rule(KLCRule):
             )
 
             for g in self.bad_fabrication_width:
-                self.errorExtra(graphItemString(g, layer=True, width=True))
+                self.errorExtra(graphItemString, g, layer=True, width=True)
 
         if self.non_nominal_width:
             self.warning(
@@ -231,7 +233,7 @@ class Rule(KLCRule):
             )
 
             for g in self.non_nominal_width:
-                self.warningExtra(graphItemString(g, layer=True, width=True))
+                self.warningExtra(graphItemString, g, layer=True, width=True)
 
         return len(self.bad_fabrication_width) > 0
 
@@ -286,7 +288,7 @@ class Rule(KLCRule):
         if self.incorrect_width:
             self.info("Setting F.Fab lines to correct width")
             for graph in self.bad_fabrication_width:
-                graph["width"] = KLC_FAB_WIDTH
+                graphSource(graph)["width"] = KLC_FAB_WIDTH
 
         if self.missing_value:
             self.info("Fixing 'Value' text on F.Fab layer")
@@ -6,23 +6,26 @@ import re
 from typing import Any, Dict, List, Optional
 
 from boundingbox import BoundingBox
-from kicad_mod import KicadMod
+from kicad_mod import KicadMod, pointKey
 from rules_footprint.klc_constants import KLC_CRTYD_GRID, KLC_CRTYD_WIDTH
 from rules_footprint.rule import (
     KLCRule,
     getEndPoint,
     getStartPoint,
     graphItemString,
+    graphSource,
     mapToGrid,
-    mmToNanoMeter,
+    offGrid,
 )
 
 
 class Rule(KLCRule):
     """Courtyard layer requirements"""
 
-    def __init__(self, component: KicadMod, args):
-        super().__init__(component, args)
+    sections = KicadMod.GRAPHIC_SECTIONS | {"pads"}
+
+    def reset(self, component: KicadMod) -> None:
+        super().reset(component)
 
         self.module_dir: str = ""
 
@@ -126,27 +129,39 @@ class Rule(KLCRule):
             return []
 
         # calculate degree of vertices of the graph
+        # vertex 2*i is the start and 2*i+1 the end point of layer[i]
         degree = [1]*2*len(layer)
+        points = []
+        for graph in layer:
+            points += [getStartPoint(graph), getEndPoint(graph)]
+        keys = [pointKey(p) for p in points]
+
+        # lines are connected if their end points are the same (in nanometers),
+        # arcs get a larger tolerance
+        is_arc = ["angle" in graph for graph in layer for _ in range(2)]
+        vertices: Dict[Any, List[int]] = {}
+        for v, key in enumerate(keys):
+            if not is_arc[v]:
+                vertices.setdefault(key, []).append(v)
 
         for i in range(len(layer)):
-            pi = [getStartPoint(layer[i]), getEndPoint(layer[i])]
             # check for circles
-            if isSame(pi[0], pi[1], 0):
+            if keys[2 * i] == keys[2 * i + 1]:
                 degree[i * 2] += 1
                 degree[i * 2 + 1] += 1
 
-            for j in range(i + 1, len(layer)):
-                pj = [getStartPoint(layer[j]), getEndPoint(layer[j])]
-
-                # check the line against the other one
-                tolerance = 1e-9
-                if "angle" in layer[i] or "angle" in layer[j]:
-                    tolerance = 0.01
-                for ii in range(2):
-                    for jj in range(2):
-                        if isSame(pi[ii], pj[jj], tolerance):
-                            degree[i * 2 + ii] += 1
-                            degree[j * 2 + jj] += 1
+        for v, key in enumerate(keys):
+            if is_arc[v]:
+                # compare with all vertices of the other graph items
+                for w in range(len(keys)):
+                    if w // 2 != v // 2 and (not is_arc[w] or w > v):
+                        if isSame(points[v], points[w], 0.01):
+                            degree[v] += 1
+                            degree[w] += 1
+            else:
+                # all other vertices with this key, but not of the same item
+                same = [w for w in vertices[key] if w // 2 != v // 2]
+                degree[v] += len(same)
 
         bad = []
         for i in range(len(layer)):
@@ -190,7 +205,8 @@ class Rule(KLCRule):
         self.unconnected.extend(self.isClosed(self.bCourtyard))
 
         # Check for elements that are not on the grid
-        GRID = mmToNanoMeter(KLC_CRTYD_GRID)
+        graphs = []
+        coordinates = []
         for graph in self.courtyard:
             if graph["width"] != KLC_CRTYD_WIDTH:
                 self.bad_width.append(graph)
@@ -203,20 +219,12 @@ class Rule(KLCRule):
                 continue
 
             # make a list of all x and y coordinates of this graphical elements
-            x1 = mmToNanoMeter(start["x"])
-            y1 = mmToNanoMeter(start["y"])
-            x2 = mmToNanoMeter(end["x"])
-            y2 = mmToNanoMeter(end["y"])
-            check = [x1, y1, x2, y2]
-
-            # use a modulo division to check if those coordinates are on the grid
-            # if at least one of the coordinates is not on the grid, add this
-            # element to the bad_grid list
-            grid_error = False
-            for c in check:
-                if not (c % GRID) == 0:
-                    grid_error = True
-                    break
+            graphs.append(graph)
+            coordinates.append([start["x"], start["y"], end["x"], end["y"]])
+
+        # if at least one of the coordinates is not on the grid, add this
+        # element to the bad_grid list
+        for graph, grid_error in zip(graphs, offGrid(coordinates, KLC_CRTYD_GRID)):
             if grid_error:
                 self.bad_grid.append(graph)
 
@@ -228,7 +236,7 @@ class Rule(KLCRule):
                 )
             )
             for bad in self.bad_width:
-                self.errorExtra(graphItemString(bad, layer=True, width=True))
+                self.errorExtra(graphItemString, bad, layer=True, width=True)
 
         # Check that courtyard items are on correct grid
         if self.bad_grid:
@@ -236,14 +244,14 @@ class Rule(KLCRule):
                 "Courtyard lines are not on {grid}mm grid".format(grid=KLC_CRTYD_GRID)
             )
             for bad in self.bad_grid:
-                self.errorExtra(graphItemString(bad, layer=True, width=False))
+                self.errorExtra(graphItemString, bad, layer=True, width=False)
 
         # Check that courtyard is closed
         if self.unconnected:
             self.error("Courtyard must be closed.")
             self.errorExtra("The following lines have unconnected endpoints")
             for bad in self.unconnected:
-                self.errorExtra(graphItemString(bad, layer=True, width=False))
+                self.errorExtra(graphItemString, bad, layer=True, width=False)
 
         return bool(self.bad_width or self.bad_grid or self.unconnected)
 
@@ -254,12 +262,18 @@ class Rule(KLCRule):
         if self.bad_width:
             self.info("Fixing line width of courtyard items")
         for graph in self.bad_width:
-            graph["width"] = KLC_CRTYD_WIDTH
+            graphSource(graph)["width"] = KLC_CRTYD_WIDTH
 
         if self.bad_grid:
             self.info("Fixing grid alignment of courtyard items")
         for item in self.bad_grid:
-            if "center" in item:  # Circle
+            item = graphSource(item)
+            if "points" in item:  # Polygons
+                for point in item["points"]:
+                    point["x"] = mapToGrid(point["x"], KLC_CRTYD_GRID)
+                    point["y"] = mapToGrid(point["y"], KLC_CRTYD_GRID)
+                continue
+            elif "center" in item:  # Circle
                 key = "center"
             else:  # Lines, Arcs
                 key = "start"
@@ -11,8 +11,10 @@ from rules_footprint.rule import KLCRule, getEndPoint, getStartPoint, graphItemS
 class Rule(KLCRule):
     """Elements on the graphic layer should not overlap"""
 
-    def __init__(self, component: KicadMod, args):
-        super().__init__(component, args)
+    sections = frozenset(["circles", "lines"])
+
+    def reset(self, component: KicadMod) -> None:
+        super().reset(component)
 
         self.overlaps: Dict[str, List[Any]] = {}
         self.errcnt: int = 0
@@ -131,7 +133,7 @@ class Rule(KLCRule):
                     " element on the same layer"
                 )
                 for bad in self.overlaps[layer]:
-                    self.errorExtra(graphItemString(bad, layer=True, width=False))
+                    self.errorExtra(graphItemString, bad, layer=True, width=False)
 
         return self.errcnt > 0
 
@@ -5,8 +5,10 @@ from rules_footprint.rule import KLCRule
 class Rule(KLCRule):
     """For surface-mount devices, placement type must be set to "Surface Mount" """
 
-    def __init__(self, component: KicadMod, args):
-        super().__init__(component, args)
+    sections = frozenset(["attr", "pads"])
+
+    def reset(self, component: KicadMod) -> None:
+        super().reset(component)
 
         self.pth_count: int = 0
         self.smd_count: int = 0
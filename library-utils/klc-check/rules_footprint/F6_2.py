@@ -1,5 +1,6 @@
 from math import sqrt
 
+from kicad_mod import KicadMod
 from rules_footprint.rule import KLCRule
 
 
@@ -9,6 +10,8 @@ class Rule(KLCRule):
     (IPC-7351).
     """
 
+    sections = KicadMod.GRAPHIC_SECTIONS | {"attr", "pads"}
+
     def check(self) -> bool:
         """
         Proceeds the checking of the rule.
@@ -7,11 +7,13 @@ from rules_footprint.rule import KLCRule
 class Rule(KLCRule):
     """Pad requirements for SMD footprints"""
 
+    sections = frozenset(["pads"])
+
     REQUIRED_LAYERS = ("Cu", "Paste", "Mask")
     SIDES = ("F.", "B.")
 
-    def __init__(self, component: KicadMod, args):
-        super().__init__(component, args)
+    def reset(self, component: KicadMod) -> None:
+        super().reset(component)
 
         self.stencil_pads_with_number: List[Dict[str, Any]] = []
 
@@ -7,8 +7,10 @@ from rules_footprint.rule import KLCRule
 class Rule(KLCRule):
     """For through-hole components, footprint anchor is set on pad 1"""
 
-    def __init__(self, component: KicadMod, args):
-        super().__init__(component, args)
+    sections = frozenset(["attr", "pads"])
+
+    def reset(self, component: KicadMod) -> None:
+        super().reset(component)
 
         self.pin1_position: List[float] = []
         self.pin1_count: int = 0
@@ -4,6 +4,8 @@ from rules_footprint.rule import KLCRule
 class Rule(KLCRule):
     """Pad 1 should be denoted by rectangular pad"""
 
+    sections = frozenset(["attr", "pads"])
+
     NAMES = ["1", "A", "A1", "P1", "PAD1"]
     PAD_1_SHAPES = ["rect", "roundrect"]
 
@@ -20,10 +20,12 @@ from rules_footprint.rule import KLCRule
 class Rule(KLCRule):
     """Pad requirements for THT footprints"""
 
+    sections = frozenset(["pads"])
+
     REQUIRED_LAYERS = ["*.Cu", "*.Mask"]
 
-    def __init__(self, component: KicadMod, args):
-        super().__init__(component, args)
+    def reset(self, component: KicadMod) -> None:
+        super().reset(component)
 
         self.wrong_layers: List[Dict[str, Any]] = []
 
@@ -6,6 +6,8 @@ from rules_footprint.rule import KLCRule
 class Rule(KLCRule):
     """Minimum annular ring width"""
 
+    sections = frozenset(["pads"])
+
     def checkPad(self, pad: Dict[str, Any]) -> bool:
         if "size" not in pad["drill"]:
             self.error(
@@ -6,6 +6,8 @@ from rules_footprint.rule import KLCRule
 class Rule(KLCRule):
     """Minimum hole drill size"""
 
+    sections = frozenset(["pads"])
+
     def checkPad(self, pad: Dict[str, Any]) -> bool:
 
         if "drill" not in pad:
@@ -7,6 +7,8 @@ from rules_footprint.rule import KLCRule
 class Rule(KLCRule):
     """Footprint meta-data is filled in as appropriate"""
 
+    sections = frozenset(["texts"])
+
     def checkDocs(self) -> bool:
         error = False
         if not self.module.description:
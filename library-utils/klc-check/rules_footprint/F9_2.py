@@ -4,6 +4,8 @@ from rules_footprint.rule import KLCRule
 class Rule(KLCRule):
     """Footprint properties should be left to default values"""
 
+    sections = frozenset()
+
     def check(self) -> bool:
         """
         Proceeds the checking of the rule.
@@ -13,11 +13,13 @@ OLD_SYSMOD_PREFIX_RE = r"^(\$\{KICAD[0-7]_3DMODEL_DIR\})/"
 class Rule(KLCRule):
     """Footprint 3D model requirements"""
 
+    sections = frozenset(["attr", "models"])
+
     # Regular expression for suffixes that shouldn't be in the model file
     SUFFIX_RE = "(_ThermalVias|_Pad[0-9.]*x[0-9.]*mm|_HandSolder|_CircularHoles)"
 
-    def __init__(self, component: KicadMod, args):
-        super().__init__(component, args)
+    def reset(self, component: KicadMod) -> None:
+        super().reset(component)
 
         self.model3D_wrongOffset: bool = False
         self.model3D_wrongRotation: bool = False
@@ -6,6 +6,8 @@ from rules_footprint.rule import KLCRule
 class Rule(KLCRule):
     """Only standard characters are used for naming libraries and components"""
 
+    sections = frozenset()
+
     # Set of allowed chars. Some characters need to be escaped.
     ALLOWED_CHARS = r"a-zA-Z0-9_\-\.,\+"
     PATTERN = re.compile("^[" + ALLOWED_CHARS + "]+$")
@@ -7,6 +7,8 @@ from rules_footprint.rule import KLCRule
 class Rule(KLCRule):
     """Library files must use Unix-style line endings (LF)"""
 
+    sections = frozenset()
+
     def check(self) -> bool:
 
         # Only perform this check on linux systems (i.e. Travis)
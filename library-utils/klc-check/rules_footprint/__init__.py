@@ -22,7 +22,7 @@ def get_all_footprint_rules():
         G1_7,
     )
 
-    return {
+    rules = {
         "EC01": EC01,
         "G1.1": G1_1,
         "G1.7": G1_7,
@@ -43,3 +43,9 @@ def get_all_footprint_rules():
         "F9.2": F9_2,
         "F9.3": F9_3,
     }
+
+    # compute the name, url and description once per rule
+    for rule in rules.values():
+        rule.Rule.register()
+
+    return rules
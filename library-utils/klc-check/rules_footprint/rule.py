@@ -1,6 +1,6 @@
 import os
 import sys
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
 
 common = os.path.abspath(
     os.path.join(os.path.dirname(__file__), os.path.pardir, "common")
@@ -9,17 +9,32 @@ common = os.path.abspath(
 if common not in sys.path:
     sys.path.insert(0, common)
 
-from kicad_mod import KicadMod
+from kicad_mod import KicadMod, Segment, mmToNanoMeter, pointKey  # noqa: F401
 from rulebase import KLCRuleBase
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
+
+# Snap a dimension (in mm) to the grid, calculated in nanometers to be exact
 def mapToGrid(dimension: float, grid: float) -> float:
-    return round(dimension / grid) * grid
+    GRID = mmToNanoMeter(grid)
+    return round(mmToNanoMeter(dimension) / GRID) * GRID / 1e6
+
+
+# Check rows of coordinates (in mm) against a grid
+# Returns a bool per row, True if any coordinate of the row is not on the grid
+def offGrid(rows: List[List[float]], grid: float) -> List[bool]:
+    GRID = mmToNanoMeter(grid)
 
+    if numpy is not None and rows:
+        # numpy.rint rounds half to even, just like round() in mmToNanoMeter
+        nm = numpy.rint(numpy.array(rows, dtype=float) * 1e6).astype(numpy.int64)
+        return (nm % GRID != 0).any(axis=1).tolist()
 
-# Convert mm to microns
-def mmToNanoMeter(mm: float) -> int:
-    return round(mm * 1e6)
+    return [any(mmToNanoMeter(c) % GRID != 0 for c in row) for row in rows]
 
 
 def getStartPoint(graph: Dict[str, Any]):
@@ -38,6 +53,14 @@ def getEndPoint(graph: Dict[str, Any]):
         return None
 
 
+# Return the item of the footprint a graph item belongs to
+# Edges of rects and polygons are immutable Segments, changes go to their source
+def graphSource(graph: Dict[str, Any]) -> Dict[str, Any]:
+    if isinstance(graph, Segment):
+        return graph.source
+    return graph
+
+
 # Display string for a graph item
 # Line / Arc / Circle
 def graphItemString(
@@ -90,17 +113,23 @@ class KLCRule(KLCRuleBase):
     A base class to represent a KLC rule
     """
 
-    def __init__(self, module: KicadMod, args):
+    def __init__(self, module: Optional[KicadMod], args):
 
         super().__init__()
 
-        self.module: KicadMod = module
         self.args = args
-        self.needsFixMore: bool = False
 
         # Illegal chars
         self.illegal_chars = ["*", "?", ":", "/", "\\", "[", "]", ";", "|", "=", ","]
 
+        self.reset(module)
+
+    def reset(self, module: KicadMod) -> None:
+        super().reset(module)
+
+        self.module: KicadMod = module
+        self.needsFixMore: bool = False
+
     def fix(self) -> None:
         self.info("fix not supported")
 
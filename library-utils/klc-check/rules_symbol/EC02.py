@@ -7,8 +7,10 @@ from rules_symbol.rule import KLCRule, positionFormater
 class Rule(KLCRule):
     """Check part reference, name and footprint position and alignment"""
 
-    def __init__(self, component: KicadSymbol):
-        super().__init__(component)
+    sections = frozenset(["pins", "properties", "rectangles", "polylines"])
+
+    def reset(self, component: KicadSymbol) -> None:
+        super().reset(component)
 
         self.recommended_ref_pos: Dict[str, float] = {}
         self.recommended_ref_alignment: str = ""
@@ -4,6 +4,8 @@ from rules_symbol.rule import KLCRule, pinString
 class Rule(KLCRule):
     """Pin names should only contain ascii chars"""
 
+    sections = frozenset(["pins"])
+
     def checkPinsAscii(self):
         evil_pins = [pin for pin in self.component.pins if not pin.name.isascii()]
 
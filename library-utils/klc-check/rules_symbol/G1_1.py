@@ -6,6 +6,8 @@ from rules_symbol.rule import KLCRule
 class Rule(KLCRule):
     """Only standard characters are used for naming libraries and components"""
 
+    sections = frozenset()
+
     def check(self) -> bool:
 
         allowed = string.digits + string.ascii_letters + "_-.+,"
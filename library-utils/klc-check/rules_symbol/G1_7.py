@@ -8,10 +8,12 @@ from rules_symbol.rule import KLCRule
 class Rule(KLCRule):
     """Library files must use Unix-style line endings (LF)"""
 
+    sections = frozenset()
+
     lib_error = False
 
-    def __init__(self, component: KicadSymbol):
-        super().__init__(component)
+    def reset(self, component: KicadSymbol) -> None:
+        super().reset(component)
 
         self.lib_error: bool = False
 
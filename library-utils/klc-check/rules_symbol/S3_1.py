@@ -7,6 +7,8 @@ from rules_symbol.rule import KLCRule
 class Rule(KLCRule):
     """Origin is centered on the middle of the symbol"""
 
+    sections = frozenset(["pins", "rectangles", "polylines"])
+
     def check(self) -> bool:
         """
         Calculate the 'bounds' of the symbol based on rectangle (if only a
@@ -7,8 +7,10 @@ from rules_symbol.rule import KLCRule
 class Rule(KLCRule):
     """Text fields should use a common text size of 50mils"""
 
-    def __init__(self, component: KicadSymbol):
-        super().__init__(component)
+    sections = frozenset(["pins", "properties"])
+
+    def reset(self, component: KicadSymbol) -> None:
+        super().reset(component)
 
         self.violating_pins: List[Pin] = []
         self.violating_properties: List[Property] = []
@@ -8,8 +8,10 @@ from rules_symbol.rule import KLCRule
 class Rule(KLCRule):
     """Symbol outline and fill requirements"""
 
-    def __init__(self, component: KicadSymbol):
-        super().__init__(component)
+    sections = frozenset(["pins", "properties", "rectangles", "polylines"])
+
+    def reset(self, component: KicadSymbol) -> None:
+        super().reset(component)
 
         self.center_rect_polyline: Optional[Polyline] = None
 
@@ -5,6 +5,8 @@ from rules_symbol.rule import KLCRule
 class Rule(KLCRule):
     """Pin name position offset"""
 
+    sections = frozenset()
+
     def check(self) -> bool:
         # no need to check this for a derived symbols
         if self.component.extends is not None:
@@ -7,8 +7,10 @@ from rules_symbol.rule import KLCRule, pinString
 class Rule(KLCRule):
     """General pin requirements"""
 
-    def __init__(self, component: KicadSymbol):
-        super().__init__(component)
+    sections = frozenset(["pins", "rectangles", "polylines"])
+
+    def reset(self, component: KicadSymbol) -> None:
+        super().reset(component)
 
         self.violating_pins: List[Pin] = []
 
@@ -38,7 +40,7 @@ class Rule(KLCRule):
             identity = (pin.number, pin.demorgan, pin.unit)
             if identity in seen:
                 self.error("Pin {n} is duplicated:".format(n=pin.number))
-                self.errorExtra(pinString(pin))
+                self.errorExtra(pinString, pin)
             seen.add(identity)
 
         return len(seen) != len(test_pins)  # true iff there are duplicates
@@ -6,6 +6,8 @@ from rules_symbol.rule import KLCRule, pinString
 class Rule(KLCRule):
     """Pins should be grouped by function"""
 
+    sections = frozenset(["pins"])
+
     def checkGroundPins(self) -> None:
         # Includes negative power pins
         GND = ["^[ad]*g(rou)*nd(a)*$", "^[ad]*v(ss)$"]
@@ -25,7 +27,7 @@ class Rule(KLCRule):
                                 "Ground and negative power pins should be placed at"
                                 " bottom of symbol"
                             )
-                        self.warningExtra(pinString(pin))
+                        self.warningExtra(pinString, pin)
 
     def checkPowerPins(self) -> None:
         # Positive power pins only
@@ -45,7 +47,7 @@ class Rule(KLCRule):
                             self.warning(
                                 "Positive power pins should be placed at top of symbol"
                             )
-                        self.warningExtra(pinString(pin))
+                        self.warningExtra(pinString, pin)
 
     def check(self) -> bool:
         # no need to check pins on a derived symbols
@@ -2,16 +2,19 @@ import sys
 from typing import List
 
 from kicad_sym import KicadSymbol, Pin
+from rulebase import DeferredMessage
 from rules_symbol.rule import KLCRule, pinString
 
 
 class Rule(KLCRule):
     """Rules for pin stacking"""
 
+    sections = frozenset(["pins"])
+
     SPECIAL_POWER_PINS = ["power_in", "power_out", "output"]
 
-    def __init__(self, component: KicadSymbol):
-        super().__init__(component)
+    def reset(self, component: KicadSymbol) -> None:
+        super().reset(component)
 
         self.different_names: List[str] = []
         self.different_types: List[str] = []
@@ -55,18 +58,18 @@ class Rule(KLCRule):
             for pin in pins:
                 if pin.number_int is None and pos not in self.non_numeric:
                     self.warning(
-                        "Found non-numeric pin in a pinstack: {0}".format(
-                            pinString(pin)
-                        )
+                        "Found non-numeric pin in a pinstack: {0}",
+                        DeferredMessage(pinString, pin),
                     )
                     self.non_numeric.append(pos)
 
                 # Check1: If a single pin in a stack is of type NC, we consider this an error
                 if pin.etype == "no_connect":
                     self.error(
-                        "NC {pin} (x={x}, y={y}) is stacked on other pins".format(
-                            pin=pinString(pin), x=pin.posx, y=pin.posy
-                        )
+                        "NC {pin} (x={x}, y={y}) is stacked on other pins",
+                        pin=DeferredMessage(pinString, pin),
+                        x=pin.posx,
+                        y=pin.posy,
                     )
                     self.NC_stacked.append(pin)
 
@@ -75,7 +78,7 @@ class Rule(KLCRule):
                     self.error("Pin names in the stack have different names")
                     self.different_names.append(pos)
                     for pin in pins:
-                        self.errorExtra(pinString(pin))
+                        self.errorExtra(pinString, pin)
 
                 # Check3: exactly one pin should be visible
                 if not pin.is_hidden:
@@ -86,7 +89,7 @@ class Rule(KLCRule):
                             )
                             for pin in pins:
                                 self.errorExtra(
-                                    "{pin} is visible".format(pin=pinString(pin))
+                                    "{0} is visible", DeferredMessage(pinString, pin)
                                 )
                         self.more_then_one_visible = True
                     else:
@@ -103,9 +106,10 @@ class Rule(KLCRule):
                             " visible"
                         )
                         self.warningExtra(
-                            "Pin {0} is visible, the lowest number in this stack is {1}".format(
-                                pinString(pin), min_pin_number
-                            )
+                            "Pin {0} is visible, the lowest number in this stack"
+                            " is {1}",
+                            DeferredMessage(pinString, pin),
+                            min_pin_number,
                         )
                         self.visible_pin_not_lowest.append(pos)
 
@@ -127,9 +131,9 @@ class Rule(KLCRule):
                             )
                             for pin in pins:
                                 self.errorExtra(
-                                    "{0} is of type {1}".format(
-                                        pinString(pin), pin.etype
-                                    )
+                                    "{0} is of type {1}",
+                                    DeferredMessage(pinString, pin),
+                                    pin.etype,
                                 )
                             self.different_types.append(pos)
 
@@ -164,9 +168,9 @@ class Rule(KLCRule):
                         for ipin in pins:
                             if ipin.etype == "passive" and not ipin.is_hidden:
                                 self.errorExtra(
-                                    "{0} is of type {1} and visible".format(
-                                        pinString(ipin), ipin.etype
-                                    )
+                                    "{0} is of type {1} and visible",
+                                    DeferredMessage(pinString, ipin),
+                                    ipin.etype,
                                 )
                         break
 
@@ -179,9 +183,9 @@ class Rule(KLCRule):
                             self.error("Non passive pins in a pinstack are visible")
                             special_stack_err = True
                             self.errorExtra(
-                                "{0} is of type {1} and invisible".format(
-                                    pinString(pin), pin.etype
-                                )
+                                "{0} is of type {1} and invisible",
+                                DeferredMessage(pinString, pin),
+                                pin.etype,
                             )
 
                         if (
@@ -195,7 +199,9 @@ class Rule(KLCRule):
                             )
                             self.warningExtra(
                                 "Pin {0} is visible, the lowest number in this stack"
-                                " is {1}".format(pinString(pin), min_pin_number)
+                                " is {1}",
+                                DeferredMessage(pinString, pin),
+                                min_pin_number,
                             )
                             self.visible_pin_not_lowest.append(pos)
                         break
@@ -220,9 +226,9 @@ class Rule(KLCRule):
                                 )
                                 self.warningExtra(
                                     "Pin {0} is visible, the lowest number in this"
-                                    " stack is {1}".format(
-                                        pinString(pin), min_pin_number
-                                    )
+                                    " stack is {1}",
+                                    DeferredMessage(pinString, pin),
+                                    min_pin_number,
                                 )
                                 self.visible_pin_not_lowest.append(pos)
                         else:
@@ -231,21 +237,21 @@ class Rule(KLCRule):
                             self.error("Only one pin in a pinstack is visible")
                             for vpin in (pin for pin in pins if not pin.is_hidden):
                                 self.errorExtra(
-                                    "Pin {0} is visible".format(pinString(vpin))
+                                    "Pin {0} is visible",
+                                    DeferredMessage(pinString, vpin),
                                 )
 
             else:
                 # pinstack is none of the above cases.
                 self.error(
-                    "Illegal pin stack configuration next to {}".format(
-                        pinString(pins[0])
-                    )
+                    "Illegal pin stack configuration next to {}",
+                    DeferredMessage(pinString, pins[0]),
                 )
-                self.errorExtra("Power input pins: {}".format(n_power_in))
-                self.errorExtra("Power output pins: {}".format(n_power_out))
-                self.errorExtra("Output pins: {}".format(n_output))
-                self.errorExtra("Passive pins: {}".format(n_passive))
-                self.errorExtra("Other type pins: {}".format(n_others))
+                self.errorExtra("Power input pins: {}", n_power_in)
+                self.errorExtra("Power output pins: {}", n_power_out)
+                self.errorExtra("Output pins: {}", n_output)
+                self.errorExtra("Passive pins: {}", n_passive)
+                self.errorExtra("Other type pins: {}", n_others)
                 special_stack_err = True
 
         return bool(
@@ -8,6 +8,8 @@ from rules_symbol.rule import KLCRule, pinString
 class Rule(KLCRule):
     """Pin electrical type should match pin function"""
 
+    sections = frozenset(["pins"])
+
     # Power Input Pins should be 'W'
     POWER_INPUTS = ["^[ad]*g(rou)*nd(a)*$", "^[ad]*v(aa|cc|dd|ss|bat|in)$"]
 
@@ -33,8 +35,8 @@ class Rule(KLCRule):
         "bidirectional": BIDIR_PINS,
     }
 
-    def __init__(self, component: KicadSymbol):
-        super().__init__(component)
+    def reset(self, component: KicadSymbol) -> None:
+        super().reset(component)
 
         self.power_errors: List[Pin] = []
         self.suggestions: List[Pin] = []
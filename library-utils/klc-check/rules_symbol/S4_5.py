@@ -4,6 +4,8 @@ from rules_symbol.rule import KLCRule
 class Rule(KLCRule):
     """Pins not connected on the footprint may be omitted from the symbol"""
 
+    sections = frozenset(["pins"])
+
     def checkMissingPins(self) -> bool:
         int_pins = []
         for pin in self.component.pins:
@@ -8,11 +8,13 @@ from rules_symbol.rule import KLCRule, pinString
 class Rule(KLCRule):
     """Hidden pins"""
 
+    sections = frozenset(["pins"])
+
     # No-connect pins should be "N"
     NC_PINS = ["^nc$", "^dnc$", r"^n\.c\.$"]
 
-    def __init__(self, component: KicadSymbol):
-        super().__init__(component)
+    def reset(self, component: KicadSymbol) -> None:
+        super().reset(component)
 
         self.invisible_errors: List[Pin] = []
         self.power_invisible_errors: List[Pin] = []
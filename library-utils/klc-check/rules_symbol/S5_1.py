@@ -8,6 +8,8 @@ from rules_symbol.rule import KLCRule
 class Rule(KLCRule):
     """Symbols with a default footprint link to a valid footprint file"""
 
+    sections = frozenset(["properties"])
+
     def check(self) -> bool:
         fail = False
 
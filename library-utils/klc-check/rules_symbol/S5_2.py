@@ -8,8 +8,10 @@ from rules_symbol.rule import KLCRule
 class Rule(KLCRule):
     """Footprint filters should match all appropriate footprints"""
 
-    def __init__(self, component: KicadSymbol):
-        super().__init__(component)
+    sections = frozenset(["pins", "properties"])
+
+    def reset(self, component: KicadSymbol) -> None:
+        super().reset(component)
 
         self.bad_filters: List[str] = []
 
@@ -7,6 +7,8 @@ from rules_symbol.rule import KLCRule
 class Rule(KLCRule):
     """Symbol fields and metadata filled out as required"""
 
+    sections = frozenset(["pins", "properties"])
+
     def checkReference(self) -> bool:
         fail = False
         ref = self.component.get_property("Reference")
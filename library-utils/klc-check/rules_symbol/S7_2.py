@@ -5,8 +5,10 @@ from rules_symbol.rule import KLCRule
 class Rule(KLCRule):
     """Graphical symbols follow some special rules/KLC-exceptions"""
 
-    def __init__(self, component: KicadSymbol):
-        super().__init__(component)
+    sections = frozenset(["pins", "properties"])
+
+    def reset(self, component: KicadSymbol) -> None:
+        super().reset(component)
 
         self.fixTooManyPins: bool = False
         self.fixNoFootprint: bool = False
@@ -21,7 +21,7 @@ def get_all_symbol_rules():
         EC03,
     )
 
-    return {
+    rules = {
         "G1.1": G1_1,
         "G1.7": G1_7,
         "S3.1": S3_1,
@@ -41,3 +41,9 @@ def get_all_symbol_rules():
         "S7.2": S7_2,
         "EC03": EC03,
     }
+
+    # compute the name, url and description once per rule
+    for rule in rules.values():
+        rule.Rule.register()
+
+    return rules
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from kicad_sym import KicadSymbol, Pin, mm_to_mil
 from rulebase import KLCRuleBase, Verbosity
 
@@ -33,6 +35,17 @@ class KLCRule(KLCRuleBase):
 
     verbosity: Verbosity = Verbosity.NONE
 
-    def __init__(self, component: KicadSymbol):
+    # path to the footprint libraries (.pretty dirs), if given
+    footprints_dir: Optional[str] = None
+
+    def __init__(
+        self, component: Optional[KicadSymbol], footprints_dir: Optional[str] = None
+    ):
         super().__init__()
+        if footprints_dir is not None:
+            self.footprints_dir = footprints_dir
+        self.reset(component)
+
+    def reset(self, component: KicadSymbol) -> None:
+        super().reset(component)
         self.component: KicadSymbol = component